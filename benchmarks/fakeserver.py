@@ -0,0 +1,143 @@
+"""Local stand-in for feed hosts, serving synthetic RSS/Atom feeds."""
+
+import asyncio
+import hashlib
+import random
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+
+
+@dataclass
+class FakeFeedOptions:
+    entries: int = 30
+    entry_bytes: int = 2000
+    latency_ms: float = 50
+    error_rate: float = 0.0
+    etag_rate: float = 0.5
+    missing_date_rate: float = 0.05
+
+
+def _entry_dates(feed_id: int, count: int) -> list[datetime]:
+    # Newest first, a few hours apart, like most real feeds.
+    now = datetime.now(UTC).replace(microsecond=0)
+    rng = random.Random(feed_id)  # noqa: S311
+    dates, date = [], now
+    for _ in range(count):
+        date -= timedelta(minutes=rng.randint(10, 600))
+        dates.append(date)
+    return dates
+
+
+def render_feed(feed_id: int, options: FakeFeedOptions) -> bytes:
+    rng = random.Random(feed_id)  # noqa: S311
+    body = escape("lorem ipsum dolor sit amet " * (options.entry_bytes // 27 + 1))
+    dates = _entry_dates(feed_id, options.entries)
+    atom = feed_id % 2 == 1
+
+    items = []
+    for i, date in enumerate(dates):
+        link = f"https://example.com/feeds/{feed_id}/entries/{i}"
+        has_date = rng.random() >= options.missing_date_rate
+        if atom:
+            updated = f"<updated>{date.isoformat()}</updated>" if has_date else ""
+            items.append(
+                f"<entry><title>Entry {i} of feed {feed_id}</title>"
+                f'<link href="{link}"/><id>{link}</id>{updated}'
+                f"<author><name>Author {feed_id}</name></author>"
+                f'<content type="html">{body}</content></entry>'
+            )
+        else:
+            pub_date = f"<pubDate>{format_datetime(date)}</pubDate>" if has_date else ""
+            items.append(
+                f"<item><title>Entry {i} of feed {feed_id}</title>"
+                f"<link>{link}</link><guid>{link}</guid>{pub_date}"
+                f"<description>{body}</description></item>"
+            )
+
+    if atom:
+        document = (
+            '<?xml version="1.0" encoding="utf-8"?>'
+            '<feed xmlns="http://www.w3.org/2005/Atom">'
+            f"<title>Feed {feed_id}</title><id>urn:feed:{feed_id}</id>"
+            f"{''.join(items)}</feed>"
+        )
+    else:
+        document = (
+            '<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+            f"<title>Feed {feed_id}</title><link>https://example.com/{feed_id}</link>"
+            f"{''.join(items)}</channel></rss>"
+        )
+    return document.encode()
+
+
+class FakeFeedServer:
+    """Serves /feeds/<id>.xml with configurable latency, errors and ETag/304
+    support. Feed bodies are rendered once per feed and then cached."""
+
+    def __init__(self, options: FakeFeedOptions, port: int = 0):
+        self.options = options
+        self._port = port
+        self._bodies: dict[int, tuple[bytes, str]] = {}
+        self._runner: web.AppRunner | None = None
+        self._rng = random.Random(0)  # noqa: S311
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._port}"
+
+    def feed_url(self, feed_id: int) -> str:
+        return f"{self.base_url}/feeds/{feed_id}.xml"
+
+    def _body(self, feed_id: int) -> tuple[bytes, str]:
+        if feed_id not in self._bodies:
+            body = render_feed(feed_id, self.options)
+            etag = '"' + hashlib.md5(body, usedforsecurity=False).hexdigest() + '"'
+            self._bodies[feed_id] = (body, etag)
+        return self._bodies[feed_id]
+
+    async def _handle_feed(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        feed_id = int(request.match_info["feed_id"])
+        latency = self.options.latency_ms / 1000
+        await asyncio.sleep(self._rng.uniform(0.5 * latency, 1.5 * latency))
+
+        if self._rng.random() < self.options.error_rate:
+            return web.Response(status=503)
+
+        body, etag = self._body(feed_id)
+        feed_rng = random.Random(feed_id)  # noqa: S311
+        sends_etag = feed_rng.random() < self.options.etag_rate
+        if sends_etag and request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+
+        headers = {"ETag": etag} if sends_etag else {}
+        content_type = "application/atom+xml" if feed_id % 2 else "application/rss+xml"
+        return web.Response(body=body, headers=headers, content_type=content_type)
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get(r"/feeds/{feed_id:\d+}.xml", self._handle_feed)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self._port)
+        await site.start()
+        self._port = self._runner.addresses[0][1]
+
+    async def close(self) -> None:
+        await self._runner.cleanup()
+
+
+async def serve(options: FakeFeedOptions, port: int) -> None:
+    server = FakeFeedServer(options, port)
+    await server.start()
+    print(f"Serving fake feeds at {server.base_url}/feeds/<id>.xml")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve(FakeFeedOptions(), 8080))
@@ -0,0 +1,78 @@
+"""Import-time budget for the web app, run from the repository root:
+
+    python -m benchmarks.importtime --budget 1.0
+
+Measures the time to import feedbasket.main in a fresh interpreter, net of
+interpreter startup, and checks that heavy modules are only loaded on first
+use. Exits with status 1 if either check fails, so it can gate CI. The same
+checks run in tests/test_importtime.py.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+MODULE = "feedbasket.main"
+# Loaded on first use: discovery, parse workers and template filters.
+LAZY_MODULES = ("feedparser", "bs4", "lxml", "tldextract", "tzlocal", "requests")
+# Most of it goes to litestar and aiohttp themselves, about 0.6s on a small
+# container, the app's own modules add under 0.2s.
+BUDGET_SEC = 1.0
+
+
+def _run(code: str) -> tuple[float, str, str]:
+    start = time.perf_counter()
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, result.stdout, result.stderr
+
+
+def _slowest_imports(importtime: str, count: int) -> list[dict]:
+    """Top-level imports with the largest cumulative time, from -X importtime."""
+    imports = []
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        if not cumulative.strip().isdigit() or name.startswith("  "):
+            continue
+        imports.append({"module": name.strip(), "ms": int(cumulative) / 1000})
+    return sorted(imports, key=lambda item: item["ms"], reverse=True)[:count]
+
+
+def measure(runs: int) -> dict:
+    # The best of several runs, net of a bare interpreter startup.
+    baseline = min(_run("pass")[0] for _ in range(runs))
+    check = f"import sys, {MODULE}; print(','.join(sorted(sys.modules)))"
+    samples = [_run(check) for _ in range(runs)]
+    elapsed, modules, importtime = min(samples, key=lambda sample: sample[0])
+
+    loaded = set(modules.strip().split(","))
+    return {
+        "module": MODULE,
+        "import_sec": elapsed - baseline,
+        "eagerly_loaded": [name for name in LAZY_MODULES if name in loaded],
+        "slowest_imports": _slowest_imports(importtime, 10),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=BUDGET_SEC, help="Seconds.")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+    results["budget_sec"] = args.budget
+    print(json.dumps(results, indent=2))
+
+    if results["eagerly_loaded"]:
+        sys.exit(f"Loaded at import: {', '.join(results['eagerly_loaded'])}")
+    if results["import_sec"] > args.budget:
+        sys.exit(f"Import took {results['import_sec']:.3f}s, over the budget.")
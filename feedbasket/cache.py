@@ -0,0 +1,88 @@
+"""In-process caches for rendered pages and template fragments."""
+
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+from feedbasket import config
+
+
+class LRUCache:
+    """Least-recently-used cache capped by the total size of its values.
+
+    Values are stored with their size in bytes, as given by the caller, and
+    optionally a time-to-live. The least recently used values are evicted
+    once the cap is exceeded."""
+
+    def __init__(self, max_bytes: int):
+        self._max_bytes = max_bytes
+        self._items: OrderedDict[Hashable, tuple[Any, int, float | None]] = (
+            OrderedDict()
+        )
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable) -> Any | None:
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        value, _, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.pop(key)
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(
+        self, key: Hashable, value: Any, size: int, ttl: float | None = None
+    ) -> None:
+        if size > self._max_bytes:
+            return
+        self.pop(key)
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._items[key] = (value, size, expires_at)
+        self.size += size
+        while self.size > self._max_bytes:
+            _, (_, evicted_size, _) = self._items.popitem(last=False)
+            self.size -= evicted_size
+
+    def pop(self, key: Hashable) -> Any | None:
+        item = self._items.pop(key, None)
+        if item is None:
+            return None
+        self.size -= item[1]
+        return item[0]
+
+    def clear(self) -> None:
+        self._items.clear()
+        self.size = 0
+
+
+# Rendered entries of the timelines and the home sidebar, see template.py.
+fragments = LRUCache(config.FRAGMENT_CACHE_MAX_BYTES)
+# Whole pages with their ETags, see main.py.
+pages = LRUCache(config.PAGE_CACHE_MAX_BYTES)
+
+# Bumped whenever the data behind a cached page changes: "entries" on new
+# entries and favourite toggles, "feeds" on feed and tag edits. Cache keys of
+# pages include the versions they depend on, so stale pages are never hit
+# again and age out of the cache. Versions are per process, changes are
+# announced to the others with database.invalidate_cache.
+_versions: dict[str, int] = {"entries": 0, "feeds": 0}
+
+
+def version(*names: str) -> tuple[int, ...]:
+    return tuple(_versions[name] for name in names)
+
+
+def invalidate(*names: str) -> None:
+    for name in names:
+        _versions[name] += 1
@@ -1,15 +1,20 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+from collections.abc import Callable
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 import aiosql
 import asyncpg
 
-from feedbasket import config
+from feedbasket import cache, config
+from feedbasket.importer import FeedImporter, parse_url_list
 
 if TYPE_CHECKING:
     from aiosql.queries import Queries
+    from asyncpg import Connection, Pool
     from litestar import Litestar
 
 log = logging.getLogger(__name__)
@@ -17,10 +22,17 @@ log = logging.getLogger(__name__)
 
 queries = aiosql.from_path("./feedbasket/queries", "asyncpg")
 
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+MIGRATIONS_LOCK_ID = 7_261_001  # Arbitrary, shared by all app instances.
+
+# Notification channels between web and scraper processes.
+SCRAPE_CHANNEL = "feedbasket_scrape"  # Feeds were added and are due now.
+CACHE_CHANNEL = "feedbasket_cache"  # Data behind cached pages changed.
+
 
 async def init_db(app: Litestar, queries: Queries) -> None:
     await create_db_pool(app)
-    # await create_schema(app, queries)
+    await run_migrations(app, queries)
     await add_feeds(app, queries)
 
 
@@ -33,27 +45,126 @@ async def create_db_pool(app: Litestar) -> None:
     )
 
 
-async def create_schema(app: Litestar, queries: Queries) -> None:
+async def run_migrations(app: Litestar, queries: Queries) -> None:
+    """Apply pending forward-only migrations from MIGRATIONS_DIR in version order.
+
+    Migration files are named <version>_<description>.sql and are never edited
+    once released. All pending migrations run in one transaction under an
+    advisory lock, so concurrently starting instances apply them only once."""
     pool = app.state.pool
+    migrations = sorted(
+        (int(path.name.split("_", 1)[0]), path) for path in MIGRATIONS_DIR.glob("*.sql")
+    )
+
     async with pool.acquire() as conn:
-        await queries.create_schema(conn)
+        async with conn.transaction():
+            await queries.lock_migrations(conn, lock_id=MIGRATIONS_LOCK_ID)
+            await queries.create_migrations_table(conn)
+            applied = {
+                row["version"] for row in await queries.get_applied_migrations(conn)
+            }
+
+            for version, path in migrations:
+                if version in applied:
+                    continue
+                log.info(f"Applying migration: {path.name}")
+                await conn.execute(path.read_text())
+                await queries.record_migration(
+                    conn, version=version, migration_name=path.name
+                )
 
 
 async def add_feeds(app: Litestar, queries: Queries) -> None:
-    pool = app.state.pool
+    path = Path("feeds.txt")
+    if not path.exists():
+        return
 
-    with open("feeds.txt") as file:
-        feed_urls = [line.strip() for line in file]
-
-    async with pool.acquire() as conn:
-        for feed in feed_urls:
-            await queries.insert_default_feeds(conn, feed_url=feed)
+    importer = FeedImporter(app.state.pool, queries)
+    with path.open("rb") as file:
+        await importer.import_feeds(parse_url_list(file))
 
     # async with pool.acquire() as conn:
     #     for feed in config.DEFAULT_FEEDS:
     #         await queries.insert_default_feeds(conn, feed_url=feed)
 
 
+class Listener:
+    """Holds a connection listening on notification channels, calling the given
+    callback with the payload of each notification.
+
+    If the connection is lost, such as on a database restart, it reconnects
+    with backoff. Notifications sent in the meantime are lost, so
+    `on_reconnect` is called once listening again, to catch up."""
+
+    def __init__(
+        self,
+        pool: Pool,
+        channels: dict[str, Callable[[str], None]],
+        on_reconnect: Callable[[], None] | None = None,
+    ):
+        self._pool = pool
+        self._channels = channels
+        self._on_reconnect = on_reconnect
+        self._conn: Connection | None = None
+        self._reconnecting: asyncio.Task | None = None
+        self._closed = False
+
+    async def start(self) -> None:
+        conn = await self._pool.acquire()
+        try:
+            for channel, callback in self._channels.items():
+                await conn.add_listener(
+                    channel, lambda *args, callback=callback: callback(args[-1])
+                )
+        except BaseException:
+            await self._pool.release(conn)
+            raise
+        conn.add_termination_listener(self._on_termination)
+        self._conn = conn
+
+    def _on_termination(self, conn: Connection) -> None:
+        if not self._closed and self._reconnecting is None:
+            log.warning("Lost the notification listener connection, reconnecting.")
+            self._reconnecting = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            await self._pool.release(conn)
+        delay = 1
+        try:
+            while True:
+                try:
+                    await self.start()
+                    break
+                except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                    log.warning(f"Could not reconnect the listener: {e!r}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 60)
+        finally:
+            self._reconnecting = None
+        log.info("Notification listener reconnected.")
+        if self._on_reconnect:
+            self._on_reconnect()
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._reconnecting:
+            self._reconnecting.cancel()
+        if self._conn is not None:
+            self._conn.remove_termination_listener(self._on_termination)
+            await self._pool.release(self._conn)
+            self._conn = None
+
+
+async def invalidate_cache(pool: Pool, *names: str) -> None:
+    """Invalidate cached pages that depend on the named data, see cache.py, in
+    this process and, through CACHE_CHANNEL, in all others."""
+    cache.invalidate(*names)
+    async with pool.acquire() as conn:
+        await queries.notify(conn, channel=CACHE_CHANNEL, payload=",".join(names))
+
+
 async def close_db_pool(app: Litestar) -> None:
     await app.state.pool.close()
     log.info("Connection to database closed.")
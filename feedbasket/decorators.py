@@ -1,56 +1,176 @@
 import asyncio
 import logging
+import math
+import random
+import time
 from collections.abc import Callable
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
 from functools import wraps
 
+from feedbasket import config, metrics
+
 log = logging.getLogger(__name__)
 
 
 class RetryLimitError(Exception):
-    def __init__(self, func_name, args, kwargs):
+    def __init__(self, func_name, args, kwargs, retry_after: float | None = None):
         self.func_name = func_name
         self.args = args
         self.kwargs = kwargs
+        self.retry_after = retry_after
 
     def __str__(self):
         return f"{self.func_name} failed after retrying: {self.args} {self.kwargs}"
 
 
+class CircuitOpenError(Exception):
+    def __init__(self, key: str, retry_in: float):
+        self.key = key
+        self.retry_in = retry_in
+
+    def __str__(self):
+        return f"Circuit open for {self.key}, retry in {self.retry_in:.0f}s"
+
+
+class CircuitBreaker:
+    """Fails fast for a key, such as a host, after repeated failures.
+
+    After `threshold` consecutive failures the circuit opens for `cooldown`
+    seconds, doubling with every further failure up to `max_cooldown`. Calls go
+    through again once the cool-down is over, and a single success closes it."""
+
+    def __init__(self, threshold: int, cooldown: float, max_cooldown: float):
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._max_cooldown = max_cooldown
+        self._failures: dict[str, int] = {}
+        self._open_until: dict[str, float] = {}
+
+    def retry_in(self, key: str) -> float:
+        """Seconds until the circuit for `key` lets calls through, 0 if closed."""
+        return max(self._open_until.get(key, 0) - time.monotonic(), 0)
+
+    def check(self, key: str) -> None:
+        if retry_in := self.retry_in(key):
+            metrics.CIRCUIT_REJECTED.inc()
+            raise CircuitOpenError(key, retry_in)
+
+    def success(self, key: str) -> None:
+        self._failures.pop(key, None)
+        self._open_until.pop(key, None)
+
+    def failure(self, key: str) -> None:
+        failures = self._failures.get(key, 0) + 1
+        self._failures[key] = failures
+        if failures >= self._threshold:
+            exponent = min(failures - self._threshold, 16)
+            self.trip(key, min(self._cooldown * 2**exponent, self._max_cooldown))
+
+    def trip(self, key: str, seconds: float) -> None:
+        """Open the circuit for `key` for at least `seconds`, up to `max_cooldown`
+        however long a host asks us to stay away."""
+        seconds = min(seconds, self._max_cooldown)
+        open_until = max(self._open_until.get(key, 0), time.monotonic() + seconds)
+        self._open_until[key] = open_until
+        metrics.CIRCUIT_TRIPS.inc()
+        log.warning(f"Circuit open for {key} for {seconds:.0f}s.")
+
+
+def _retry_after(exc: Exception) -> float | None:
+    """Seconds from a Retry-After header on a 429/503 response error, if any,
+    up to the longest backoff of a failing feed."""
+    headers = getattr(exc, "headers", None)
+    if not headers or getattr(exc, "status", None) not in (429, 503):
+        return None
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=UTC)
+        seconds = (date - datetime.now(UTC)).total_seconds()
+    # "inf" and "nan" parse as floats, and would break scheduling the feed.
+    if not math.isfinite(seconds):
+        return None
+    return min(max(seconds, 0), config.FETCH_BACKOFF_MAX_SEC)
+
+
+def _is_failure(exc: Exception) -> bool:
+    # Any other 4xx means the host is up and answering, just not for this URL.
+    status = getattr(exc, "status", None)
+    return status is None or status >= 500 or status == 429
+
+
 def retry(
     *exceptions: type[Exception],
     retries: int = 3,
-    wait: int = 1,
+    wait: float = 1,
+    max_wait: float = 30,
+    circuit: CircuitBreaker | None = None,
+    key: Callable[..., str] | None = None,
     emit_log: bool = False,
 ) -> Callable:
     """Decorator that retries an async function through specified exceptions.
 
     exceptions: The exceptions that will trigger the retry.
     retries: Number of retries of function execution.
-    wait: Seconds to wait before retry.
+    wait: Base seconds to wait before retry, doubled on every attempt and jittered.
+    max_wait: Upper bound on a single wait. A longer Retry-After stops retrying.
+    circuit: Circuit breaker to fail fast with CircuitOpenError when open.
+    key: Called with the function arguments to get the circuit breaker key.
     emit_log: Log unsuccessful attempts."""
 
     def wrap(func):
         @wraps(func)
         async def inner(*args, **kwargs):
             retries_count = 0
+            circuit_key = key(*args, **kwargs) if circuit and key else func.__name__
 
             while True:
+                if circuit:
+                    circuit.check(circuit_key)
                 try:
                     response = await func(*args, **kwargs)
                 except exceptions as e:
                     retries_count += 1
+                    metrics.RETRIES.inc(function=func.__name__)
                     msg = f"Exception during {func} execution. {retries_count} of {retries} retries attempted."
+                    if emit_log:
+                        log.warning(msg)
+
+                    retry_after = _retry_after(e)
+                    if circuit:
+                        if _is_failure(e):
+                            circuit.failure(circuit_key)
+                        else:
+                            circuit.success(circuit_key)
+                        if retry_after and retry_after > max_wait:
+                            circuit.trip(circuit_key, retry_after)
+
+                    if retries_count >= retries or (
+                        retry_after and retry_after > max_wait
+                    ):
+                        raise RetryLimitError(
+                            func.__name__, args, kwargs, retry_after
+                        ) from e
 
-                    if retries_count >= retries:
-                        if emit_log:
-                            log.warning(msg)
-                        raise RetryLimitError(func.__name__, args, kwargs) from e
-                    else:
-                        if emit_log:
-                            log.warning(msg)
-                    if wait:
-                        await asyncio.sleep(wait)
+                    # Jitter keeps concurrent callers from retrying in lockstep.
+                    delay = min(wait * 2 ** (retries_count - 1), max_wait)
+                    delay = random.uniform(delay / 2, delay)  # noqa: S311
+                    if retry_after is not None:
+                        delay = max(delay, retry_after)
+                    if delay:
+                        await asyncio.sleep(delay)
                 else:
+                    if circuit:
+                        circuit.success(circuit_key)
                     return response
 
         return inner
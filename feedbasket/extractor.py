@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+
+from aiohttp import ClientSession, TCPConnector
+
+from feedbasket import config
+from feedbasket.readability import ReadabilityPool, extract_content_readability
+from feedbasket.scraper import HostScheduler
+
+if TYPE_CHECKING:
+    from aiosql.queries import Queries
+    from asyncpg import Pool
+
+log = logging.getLogger(__name__)
+
+
+class ContentExtractor:
+    """Fills in cleaned_content for new entries, independently of feed scraping.
+
+    The scraper queues newly inserted entries in extraction_jobs. Each worker
+    claims a batch with SKIP LOCKED, fetches and extracts the article pages and
+    writes the results back in one statement. Claims are leased, so jobs of a
+    crashed worker are picked up again once the lease expires."""
+
+    def __init__(self, pool: Pool, queries: Queries):
+        self._pool = pool
+        self._queries = queries
+        self._readability = ReadabilityPool()
+        self._hosts = HostScheduler(config.HOST_CONCURRENCY, config.HOST_MIN_DELAY_SEC)
+
+    async def _extract(self, session: ClientSession, url: str) -> str | None:
+        async with self._hosts.slot(url):
+            return await extract_content_readability(session, self._readability, url)
+
+    async def _process_batch(self, session: ClientSession) -> int:
+        async with self._pool.acquire() as conn:
+            jobs = await self._queries.claim_extraction_jobs(
+                conn,
+                batch_size=config.EXTRACTION_BATCH_SIZE,
+                lease_sec=config.EXTRACTION_LEASE_SEC,
+                max_attempts=config.EXTRACTION_MAX_ATTEMPTS,
+            )
+        if not jobs:
+            return 0
+
+        # One failing page must not fail, and use up an attempt of, the batch.
+        results = await asyncio.gather(
+            *(self._extract(session, job["entry_url"]) for job in jobs),
+            return_exceptions=True,
+        )
+        contents = []
+        for job, result in zip(jobs, results, strict=True):
+            if isinstance(result, Exception):
+                log.error(f"Could not extract {job['entry_url']}: {result!r}")
+                result = None
+            elif isinstance(result, BaseException):
+                raise result
+            contents.append(result)
+
+        # Failed jobs stay queued and are retried after the lease expires,
+        # unless they are out of attempts.
+        done = [
+            (job["entry_id"], content)
+            for job, content in zip(jobs, contents, strict=True)
+            if content or job["attempts"] >= config.EXTRACTION_MAX_ATTEMPTS
+        ]
+        if done:
+            entry_ids, cleaned_contents = zip(*done, strict=True)
+            async with self._pool.acquire() as conn:
+                await self._queries.save_extracted_content(
+                    conn,
+                    entry_ids=list(entry_ids),
+                    cleaned_contents=list(cleaned_contents),
+                )
+
+        log.debug(f"Extracted content of {len(done)} of {len(jobs)} entries.")
+        return len(jobs)
+
+    async def _purge_exhausted(self) -> None:
+        async with self._pool.acquire() as conn:
+            await self._queries.delete_exhausted_extraction_jobs(
+                conn, max_attempts=config.EXTRACTION_MAX_ATTEMPTS
+            )
+
+    async def _worker(self, session: ClientSession) -> None:
+        while True:
+            try:
+                processed = await self._process_batch(session)
+                if not processed:
+                    await self._purge_exhausted()
+            except Exception:
+                log.exception("Content extraction batch failed.")
+                processed = 0
+
+            if not processed:
+                await asyncio.sleep(config.EXTRACTION_IDLE_SEC)
+
+    async def run(self) -> None:
+        await self._readability.start()
+        try:
+            connector = TCPConnector(
+                limit_per_host=config.HOST_CONCURRENCY,
+                ttl_dns_cache=config.DNS_CACHE_TTL_SEC,
+            )
+            async with ClientSession(connector=connector) as session:
+                workers = [
+                    self._worker(session) for _ in range(config.EXTRACTION_WORKERS)
+                ]
+                await asyncio.gather(*workers)
+        finally:
+            await self._readability.close()
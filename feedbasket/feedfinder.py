@@ -1,16 +1,55 @@
+from __future__ import annotations
+
+import asyncio
 import logging
-from urllib.parse import unquote, urljoin
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING
+from urllib.parse import unquote, urljoin, urlsplit
 
-import feedparser
-import requests
-from bs4 import BeautifulSoup
+from aiohttp import ClientError, ClientSession
 
 from feedbasket import config
+from feedbasket.cache import LRUCache
+
+if TYPE_CHECKING:
+    import feedparser
+    from aiosql.queries import Queries
+    from asyncpg import Pool
 
 log = logging.getLogger(__name__)
 
 FeedMetadata = tuple[str, str, str | None, str | None]
 
+# In order of preference.
+FEED_LINK_MIME_TYPES = [
+    "application/rss+xml",
+    "application/atom+xml",
+    "application/x.atom+xml",
+    "application/x-atom+xml",
+    "application/atom",
+    "application/rss",
+    "application/rdf",
+]
+
+# "text/atom+xml",
+# "text/rss+xml",
+# "text/rdf+xml",
+# "text/atom",
+# "text/rss",
+# "text/rdf",
+# "text/xml",
+
+COMMON_FEED_PATHS = [
+    "/feed",
+    "/rss",
+    "/feed.xml",
+    "/rss.xml",
+    "/feed.atom",
+    "/atom.xml",
+    "/index.xml",
+    "/blog.xml",
+]
+
 
 def get_feed_metadata(feed_data: feedparser.FeedParserDict):
     feed_name = feed_data.feed.get("title")
@@ -19,117 +58,191 @@ def get_feed_metadata(feed_data: feedparser.FeedParserDict):
     return feed_name, feed_type, icon_url
 
 
-def get_feed_content(url: str) -> requests.Response | None:
+async def get_feed_content(session: ClientSession, url: str) -> bytes | None:
     try:
-        response = requests.get(
-            url, timeout=config.GET_TIMEOUT, headers={"User-Agent": config.USER_AGENT}
-        )
-        response.raise_for_status()
-
-        if not response.ok:
-            log.error(
-                "Failed to retrieve feed: %s, status code: %s",
-                url,
-                response.status_code,
-            )
-            return None
-        return response
+        async with session.get(
+            url,
+            raise_for_status=True,
+            timeout=config.GET_TIMEOUT,
+            headers={"User-Agent": config.USER_AGENT},
+        ) as response:
+            # read(n) only returns what is buffered, read up to the cap.
+            content = bytearray()
+            async for chunk in response.content.iter_chunked(config.FEED_CHUNK_BYTES):
+                content += chunk
+                if len(content) >= config.FEED_MAX_BYTES:
+                    break
+            return bytes(content[: config.FEED_MAX_BYTES])
+    except (ClientError, TimeoutError) as e:
+        log.error(f"Failed to retrieve: {url}: {e!r}")
+        return None
+
+
+def parse_feed_metadata(url: str, content: bytes) -> FeedMetadata | None:
+    """Feed metadata if the content is a feed feedparser recognises."""
+    # Parsers are imported on first discovery rather than at app startup.
+    import feedparser
 
-    except requests.exceptions.RequestException as e:
-        log.error(f"Failed to retrieve: {url}: {e}")
+    feed_data = feedparser.parse(content)
+    if not feed_data.get("version"):
         return None
+    return url, *get_feed_metadata(feed_data)
 
 
-def find_feed(url: str) -> FeedMetadata | None:
-    """Attempt to find a feed URL from a webpage URL.
-    Returns tuple with feed metadata or None if no feed found."""
+def get_feed_links(url: str, content: bytes) -> list[str]:
+    """Feed URLs advertised in the <link> tags of a webpage, in order of
+    preference. Only the <link> tags are parsed, in a single pass."""
+    from bs4 import BeautifulSoup, SoupStrainer
 
-    # Assume provided URL is a feed URL:
+    soup = BeautifulSoup(content, "lxml", parse_only=SoupStrainer("link"))
+    links: dict[str, list[str]] = {mime: [] for mime in FEED_LINK_MIME_TYPES}
+    for link in soup.find_all("link", href=True):
+        mime = link.get("type", "").split(";")[0].strip().lower()
+        if mime in links:
+            links[mime].append(unquote(urljoin(url, link["href"])).strip())
+    return list(dict.fromkeys(link for urls in links.values() for link in urls))
 
-    url = url.strip()
-    url = url if url.startswith("http") else ("https://" + url)
 
-    response = get_feed_content(url)
-    if not response:
+async def probe_feed(session: ClientSession, url: str) -> FeedMetadata | None:
+    content = await get_feed_content(session, url)
+    if content is None:
         return None
+    return await asyncio.to_thread(parse_feed_metadata, url, content)
 
-    feed_data = feedparser.parse(response.content)
-    mime = response.headers.get("Content-Type", "").split(";")[0]
 
-    if not feed_data.bozo and mime.endswith("xml"):
-        feed_meta = get_feed_metadata(feed_data)
-        return url, *feed_meta
+async def get_candidates(
+    session: ClientSession, url: str
+) -> tuple[FeedMetadata | None, list[str]]:
+    """Fetch the given URL. Returns its metadata if it is a feed itself,
+    otherwise the feed URLs to probe, in order of preference."""
+    content = await get_feed_content(session, url)
+    if content is None:
+        return None, []
 
-    soup = BeautifulSoup(response.content, "lxml")
+    # Assume provided URL is a feed URL:
+    if feed := await asyncio.to_thread(parse_feed_metadata, url, content):
+        return feed, []
 
-    # Find page title in <meta> tags or <title>:
+    # Search for RSS/Atom feed in <link> tags, then try common feed paths:
+    links = await asyncio.to_thread(get_feed_links, url, content)
+    paths = [unquote(urljoin(url, path)).strip() for path in COMMON_FEED_PATHS]
+    return None, list(dict.fromkeys([*links, *paths]))
 
-    #  feed_title = None
 
-    #  OG_TAGS = ["og:title", "og:site_name"]  # "og:description"]
+def normalize_url(url: str) -> str:
+    url = url.strip()
+    return url if url.startswith("http") else ("https://" + url)
 
-    #  for tag in OG_TAGS:
-    #      og_tag = soup.find("meta", property=tag)
-    #      if og_tag:
-    #          feed_title = og_tag.text.strip()
-    #          break
 
-    #  if not feed_title:
-    #      title_tag = soup.find("title")
-    #      if title_tag:
-    #          feed_title = title_tag.text.strip()
+def site_key(url: str) -> str:
+    """Normalize a site URL, so that variants of it share discovery results."""
+    parts = urlsplit(normalize_url(url))
+    key = parts.netloc.lower().removeprefix("www.") + parts.path.rstrip("/")
+    return f"{key}?{parts.query}" if parts.query else key
 
-    # Search for RSS/Atom feed in <link> tags:
 
-    FEED_LINK_MIME_TYPES = [
-        "application/rss+xml",
-        "application/atom+xml",
-        "application/x.atom+xml",
-        "application/x-atom+xml",
-        "application/atom",
-        "application/rss",
-        "application/rdf",
-    ]
+async def find_feeds(session: ClientSession, url: str) -> list[FeedMetadata]:
+    """Find all feeds of a webpage URL, probing the candidates concurrently.
+    Returns feed metadata tuples in order of preference."""
+    url = normalize_url(url)
+    feed, candidates = await get_candidates(session, url)
+    if feed:
+        return [feed]
 
-    # "text/atom+xml",
-    # "text/rss+xml",
-    # "text/rdf+xml",
-    # "text/atom",
-    # "text/rss",
-    # "text/rdf",
-    # "text/xml",
-
-    for type in FEED_LINK_MIME_TYPES:
-        link = soup.find("link", type=type, href=True)
-        links = soup.findAll("link", type=type, href=True)
-        print("multiple feeds:", links)
-        if link:
-            feed_url = unquote(urljoin(url, link["href"])).strip()
-            if response := get_feed_content(feed_url):
-                feed_data = feedparser.parse(response.content)
-                feed_meta = get_feed_metadata(feed_data)
-                return feed_url, *feed_meta
-
-    # Try common feed paths:
-
-    COMMON_FEED_PATHS = [
-        "/feed",
-        "/rss",
-        "/feed.xml",
-        "/rss.xml",
-        "/feed.atom",
-        "/atom.xml",
-        "/index.xml",
-        "/blog.xml",
+    results = await asyncio.gather(
+        *(probe_feed(session, candidate) for candidate in candidates)
+    )
+    feeds = [feed for feed in results if feed]
+    if not feeds:
+        log.error(f"Failed to find feed: {url}")
+    return feeds
+
+
+async def find_feed(session: ClientSession, url: str) -> FeedMetadata | None:
+    """Attempt to find a feed URL from a webpage URL.
+    Candidates are probed concurrently, and the most preferred feed is returned
+    as soon as it is known, without waiting for the others.
+    Returns tuple with feed metadata or None if no feed found."""
+    url = normalize_url(url)
+    feed, candidates = await get_candidates(session, url)
+    if feed:
+        return feed
+
+    tasks = [
+        asyncio.create_task(probe_feed(session, candidate)) for candidate in candidates
     ]
-    for path in COMMON_FEED_PATHS:
-        feed_url = unquote(urljoin(url, path)).strip()
-        if response := get_feed_content(feed_url):
-            mime = response.headers.get("Content-Type", "").split(";")[0]
-            if mime.endswith("xml"):
-                feed_data = feedparser.parse(response.content)
-                feed_meta = get_feed_metadata(feed_data)
-                return feed_url, *feed_meta
+    try:
+        for task in tasks:
+            if feed := await task:
+                return feed
+    finally:
+        for task in tasks:
+            task.cancel()
 
     log.error(f"Failed to find feed: {url}")
     return None
+
+
+class DiscoveryCache:
+    """Caches find_feed results by normalized site URL, in memory and optionally
+    in Postgres. Sites without a feed are cached too, for a shorter time, since
+    a failed lookup may also have been a site that was down at the time."""
+
+    def __init__(self, pool: Pool | None = None, queries: Queries | None = None):
+        self._pool = pool
+        self._queries = queries
+        self._memory = LRUCache(config.DISCOVERY_CACHE_MAX_BYTES)
+
+    def _remember(self, key: str, feed: FeedMetadata | None, ttl: float) -> None:
+        # Misses are kept as an empty tuple, None means not cached.
+        size = len(key) + sum(len(value or "") for value in feed or ())
+        self._memory.set(key, feed or (), size, ttl=ttl)
+
+    async def _load(self, key: str) -> tuple[FeedMetadata | None, float] | None:
+        async with self._pool.acquire() as conn:
+            row = await self._queries.get_discovery(conn, site_url=key)
+        if not row:
+            return None
+        feed = None
+        if row["feed_url"]:
+            feed = row["feed_url"], row["feed_name"], row["feed_type"], row["icon_url"]
+        return feed, (row["expires_at"] - datetime.now(UTC)).total_seconds()
+
+    async def _save(self, key: str, feed: FeedMetadata | None, ttl: float) -> None:
+        feed_url, feed_name, feed_type, icon_url = feed or (None, None, None, None)
+        async with self._pool.acquire() as conn:
+            await self._queries.save_discovery(
+                conn,
+                site_url=key,
+                feed_url=feed_url,
+                feed_name=feed_name,
+                feed_type=feed_type,
+                icon_url=icon_url,
+                expires_at=datetime.now(UTC) + timedelta(seconds=ttl),
+            )
+
+    async def purge_expired(self) -> None:
+        if self._pool:
+            async with self._pool.acquire() as conn:
+                await self._queries.delete_expired_discoveries(conn)
+
+    async def find_feed(self, session: ClientSession, url: str) -> FeedMetadata | None:
+        key = site_key(url)
+        cached = self._memory.get(key)
+        if cached is not None:
+            return cached or None
+
+        if self._pool and (stored := await self._load(key)):
+            feed, ttl = stored
+            self._remember(key, feed, ttl)
+            return feed
+
+        feed = await find_feed(session, url)
+        if feed:
+            ttl = config.DISCOVERY_CACHE_TTL_SEC
+        else:
+            ttl = config.DISCOVERY_CACHE_NEGATIVE_TTL_SEC
+        self._remember(key, feed, ttl)
+        if self._pool:
+            await self._save(key, feed, ttl)
+        return feed
@@ -0,0 +1,156 @@
+import logging
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from xml.parsers import expat
+
+log = logging.getLogger(__name__)
+
+ITEM_TAGS = {"item", "entry"}
+DATE_TAGS = ("pubDate", "published", "updated", "date", "issued", "modified")
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition(":")[2]
+
+
+def _parse_date(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            date = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return date if date.tzinfo else date.replace(tzinfo=UTC)
+
+
+class FeedStream:
+    """Incremental reader for a feed response body.
+
+    Chunks are fed to a pull parser that only looks at item boundaries and
+    dates. Reading stops once the feed runs into entries older than the cutoff
+    (several in a row, and only for feeds ordered newest first), or once the
+    body exceeds max_bytes. In both cases body() returns the document cut after
+    the last complete item, so that feedparser only builds the entries that
+    can still be new. The cut is at the byte offset the parser reports for the
+    item's end tag, so markup within CDATA or escaped content is never
+    mistaken for the end of an item."""
+
+    def __init__(self, cutoff: datetime, max_bytes: int, early_stop_after: int):
+        self._cutoff = cutoff
+        self._max_bytes = max_bytes
+        self._early_stop_after = early_stop_after
+        self._buffer = bytearray()
+        # Without namespace processing, tags are reported as written, prefix
+        # included, which is what the closing tags of a cut body need.
+        self._parser = expat.ParserCreate()
+        self._parser.buffer_text = True
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._parser.CharacterDataHandler = self._text
+        self._open_tags: list[str] = []  # Elements enclosing the items.
+        self._depth = 0  # Within the current item, 0 outside of items.
+        self._date_text: list[str] | None = None
+        self._date: datetime | None = None
+        self._cut: tuple[int, list[str]] | None = None
+        self._old_streak = 0
+        self._previous_date: datetime | None = None
+        self._newest_first = True
+        self._malformed = False
+        self.stopped_early = False
+        self.truncated = False
+
+    @property
+    def bytes_read(self) -> int:
+        return len(self._buffer)
+
+    def feed(self, chunk: bytes) -> bool:
+        """Consume a chunk. Returns False once no more input is needed."""
+        self._buffer += chunk
+
+        if not self._malformed:
+            try:
+                self._parser.Parse(chunk, False)
+            except expat.ExpatError:
+                # Leave it to feedparser, which copes with broken markup.
+                self._malformed = True
+
+        if self.stopped_early:
+            return False
+        if len(self._buffer) > self._max_bytes:
+            self.truncated = True
+            return False
+        return True
+
+    def _start(self, tag: str, attrs: dict) -> None:
+        if self.stopped_early:
+            return
+        if self._depth:
+            self._depth += 1
+            # Dates are direct children of the item, the first valid one wins.
+            if (
+                self._depth == 2
+                and self._date is None
+                and _local_name(tag) in DATE_TAGS
+            ):
+                self._date_text = []
+        elif _local_name(tag) in ITEM_TAGS:
+            self._depth = 1
+            self._date = None
+        else:
+            self._open_tags.append(tag)
+
+    def _text(self, data: str) -> None:
+        if self._date_text is not None:
+            self._date_text.append(data)
+
+    def _end(self, tag: str) -> None:
+        if self.stopped_early:
+            return
+        if not self._depth:
+            if self._open_tags:
+                self._open_tags.pop()
+            return
+
+        self._depth -= 1
+        if self._date_text is not None:
+            self._date = _parse_date("".join(self._date_text))
+            self._date_text = None
+        if self._depth:
+            return
+
+        # The offset is that of the end tag's "<", which has no ">" within.
+        index = self._parser.CurrentByteIndex
+        self._cut = self._buffer.index(b">", index) + 1, list(self._open_tags)
+        self._check_item_date(self._date)
+
+    def _check_item_date(self, date: datetime | None) -> None:
+        if date is None:
+            self._old_streak = 0
+            return
+
+        if self._previous_date and date > self._previous_date:
+            self._newest_first = False
+        self._previous_date = date
+
+        self._old_streak = self._old_streak + 1 if date < self._cutoff else 0
+        if self._newest_first and self._old_streak >= self._early_stop_after:
+            self.stopped_early = True
+
+    def body(self) -> bytes:
+        """The body read so far, cut after the last complete item if reading
+        stopped before the end of the document."""
+        if not (self.stopped_early or self.truncated):
+            return bytes(self._buffer)
+
+        if self.truncated:
+            log.warning(f"Feed body exceeds {self._max_bytes} bytes, truncating.")
+        if self._malformed or self._cut is None:
+            return bytes(self._buffer)
+
+        end, open_tags = self._cut
+        closing_tags = "".join(f"</{tag}>" for tag in reversed(open_tags))
+        return bytes(self._buffer[:end]) + closing_tags.encode()
@@ -0,0 +1,267 @@
+"""Bulk import of feeds from OPML files or plain lists of URLs.
+
+Usage, to import into the configured database:
+
+    python -m feedbasket.importer subscriptions.opml
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from itertools import islice
+from types import SimpleNamespace
+from typing import IO, TYPE_CHECKING
+from urllib.parse import urlsplit
+
+import asyncpg
+from aiohttp import ClientSession
+from defusedxml.ElementTree import iterparse
+
+from feedbasket import config
+
+if TYPE_CHECKING:
+    from aiosql.queries import Queries
+    from asyncpg import Pool
+
+    from feedbasket.feedfinder import DiscoveryCache
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class ImportedFeed:
+    feed_url: str
+    feed_name: str | None = None
+    tags: list[str] = field(default_factory=list)
+    feed_type: str | None = None
+    icon_url: str | None = None
+
+
+@dataclass
+class ImportResult:
+    read: int = 0
+    invalid: int = 0
+    not_found: int = 0
+    added: int = 0
+
+    def __str__(self):
+        return (
+            f"Added {self.added} new feeds of {self.read} read, "
+            f"{self.invalid} invalid, {self.not_found} without a feed."
+        )
+
+
+def _tag(name: str) -> str:
+    return name.lower().strip()
+
+
+def parse_opml(source: IO[bytes]) -> Iterator[ImportedFeed]:
+    """Stream the feeds of an OPML file. The folders an outline is nested in and
+    its category attribute become the feed's tags. Uploaded files are not to be
+    trusted: entity expansion and external references are refused."""
+    folders: list[str | None] = []
+    for event, element in iterparse(source, events=("start", "end")):
+        if element.tag != "outline":
+            continue
+        if event == "end":
+            folders.pop()
+            element.clear()
+            continue
+
+        feed_url = element.get("xmlUrl")
+        if not feed_url:
+            folders.append(element.get("text") or element.get("title"))
+            continue
+        folders.append(None)
+
+        tags = [_tag(folder) for folder in folders if folder]
+        # Categories are comma separated, each a slash delimited path.
+        for category in (element.get("category") or "").split(","):
+            if name := category.strip().rstrip("/").rpartition("/")[2]:
+                tags.append(_tag(name))
+        yield ImportedFeed(
+            feed_url=feed_url.strip(),
+            feed_name=element.get("title") or element.get("text"),
+            tags=list(dict.fromkeys(tags)),
+        )
+
+
+def parse_url_list(source: IO[bytes]) -> Iterator[ImportedFeed]:
+    """Stream a list of URLs, one per line. Empty lines and # comments are
+    skipped."""
+    for line in source:
+        url = line.decode(errors="replace").strip()
+        if url and not url.startswith("#"):
+            yield ImportedFeed(feed_url=url)
+
+
+def read_feeds(source: IO[bytes]) -> tuple[Iterator[ImportedFeed], bool]:
+    """Stream the feeds of an OPML file or a URL list, whichever it is.
+    Returns the feeds and whether the file is OPML."""
+    is_opml = source.read(512).lstrip().startswith(b"<")
+    source.seek(0)
+    return (parse_opml(source) if is_opml else parse_url_list(source)), is_opml
+
+
+def is_valid_url(url: str) -> bool:
+    parts = urlsplit(url)
+    return parts.scheme in ("http", "https") and bool(parts.netloc)
+
+
+class FeedImporter:
+    """Validates and, optionally, discovers feeds with a bounded pool of workers,
+    then adds them with a few set-based statements. New feeds are due for their
+    first scrape right away, the scheduler picks them up on its next run."""
+
+    def __init__(
+        self,
+        pool: Pool,
+        queries: Queries,
+        session: ClientSession | None = None,
+        discovery: DiscoveryCache | None = None,
+    ):
+        self._pool = pool
+        self._queries = queries
+        self._session = session
+        self._discovery = discovery
+
+    async def _resolve(
+        self, feed: ImportedFeed, discover: bool, result: ImportResult
+    ) -> ImportedFeed | None:
+        if discover:
+            found = await self._discovery.find_feed(self._session, feed.feed_url)
+            if not found:
+                result.not_found += 1
+                return None
+            feed_url, feed_name, feed_type, icon_url = found
+            feed = ImportedFeed(
+                feed_url=feed_url,
+                feed_name=feed.feed_name or feed_name,
+                tags=feed.tags,
+                feed_type=feed_type,
+                icon_url=icon_url,
+            )
+        if not is_valid_url(feed.feed_url):
+            result.invalid += 1
+            return None
+        return feed
+
+    async def _insert(self, feeds: list[ImportedFeed]) -> int:
+        added = 0
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                for start in range(0, len(feeds), config.IMPORT_BATCH_SIZE):
+                    batch = feeds[start : start + config.IMPORT_BATCH_SIZE]
+                    added += await self._queries.insert_feeds(
+                        conn,
+                        feed_urls=[feed.feed_url for feed in batch],
+                        feed_names=[feed.feed_name for feed in batch],
+                        feed_types=[feed.feed_type for feed in batch],
+                        icon_urls=[feed.icon_url for feed in batch],
+                    )
+                    pairs = [
+                        (feed.feed_url, tag) for feed in batch for tag in feed.tags
+                    ]
+                    if pairs:
+                        await self._queries.add_feed_tags(
+                            conn,
+                            feed_urls=[feed_url for feed_url, _ in pairs],
+                            tag_names=[tag_name for _, tag_name in pairs],
+                        )
+        return added
+
+    async def import_feeds(
+        self, feeds: Iterable[ImportedFeed], discover: bool = False
+    ) -> ImportResult:
+        """Add feeds, running discovery on each URL first if `discover` is set,
+        for lists of site URLs rather than feed URLs."""
+        if discover and not (self._session and self._discovery):
+            raise ValueError("Discovery needs a client session and a cache.")
+
+        result = ImportResult()
+        resolved: dict[str, ImportedFeed] = {}
+        queue: asyncio.Queue[ImportedFeed | None] = asyncio.Queue(
+            maxsize=config.IMPORT_WORKERS * 2
+        )
+
+        async def worker() -> None:
+            while (feed := await queue.get()) is not None:
+                try:
+                    feed = await self._resolve(feed, discover, result)
+                except Exception as e:
+                    log.error(f"Failed to import feed: {feed.feed_url}: {e!r}")
+                    result.not_found += 1
+                    continue
+                if feed is None:
+                    continue
+                # The same feed may be listed more than once, in other folders.
+                if existing := resolved.get(feed.feed_url):
+                    existing.tags = list(dict.fromkeys([*existing.tags, *feed.tags]))
+                else:
+                    resolved[feed.feed_url] = feed
+
+        workers = [asyncio.create_task(worker()) for _ in range(config.IMPORT_WORKERS)]
+        # Files are parsed in a thread, a batch at a time, off the event loop.
+        feeds = iter(feeds)
+        try:
+            while batch := await asyncio.to_thread(
+                list, islice(feeds, config.IMPORT_BATCH_SIZE)
+            ):
+                for feed in batch:
+                    result.read += 1
+                    await queue.put(feed)
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+        if resolved:
+            result.added = await self._insert(list(resolved.values()))
+        log.info(f"Feed import: {result}")
+        return result
+
+
+async def main(args: argparse.Namespace) -> None:
+    # Imported here, the database module imports this one.
+    from feedbasket.database import queries, run_migrations
+    from feedbasket.feedfinder import DiscoveryCache
+
+    pool = await asyncpg.create_pool(
+        config.PG_URI, min_size=1, max_size=config.PG_POOL_MIN
+    )
+    try:
+        app = SimpleNamespace(state=SimpleNamespace(pool=pool))
+        await run_migrations(app, queries)
+        async with ClientSession() as session:
+            discovery = DiscoveryCache(
+                pool if config.DISCOVERY_CACHE_PERSIST else None, queries
+            )
+            importer = FeedImporter(pool, queries, session, discovery)
+            with open(args.file, "rb") as file:
+                feeds, is_opml = read_feeds(file)
+                discover = args.discover or (not is_opml and not args.no_discover)
+                result = await importer.import_feeds(feeds, discover)
+        print(result)
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import feeds into feedbasket.")
+    parser.add_argument("file", help="OPML file or list of URLs, one per line.")
+    parser.add_argument(
+        "--discover",
+        action="store_true",
+        help="Discover feeds of OPML entries too, instead of trusting their URLs.",
+    )
+    parser.add_argument(
+        "--no-discover",
+        action="store_true",
+        help="Treat the URLs of a list as feed URLs, without discovery.",
+    )
+    logging.basicConfig(level=config.LOG_LEVEL)
+    asyncio.run(main(parser.parse_args()))
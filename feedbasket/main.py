@@ -1,8 +1,16 @@
 import asyncio
+import hashlib
+import time
+from collections.abc import Awaitable, Callable
 from contextlib import asynccontextmanager
-from typing import Annotated
+from datetime import datetime
+from typing import Annotated, ClassVar
+from xml.etree import ElementTree
 
+from aiohttp import ClientSession
+from asyncpg import Connection
 from asyncpg.pool import Pool
+from defusedxml import DefusedXmlException
 from litestar import (
     Controller,
     Litestar,
@@ -15,52 +23,226 @@ from litestar import (
 )
 from litestar.contrib.htmx.request import HTMXRequest
 from litestar.contrib.htmx.response import ClientRedirect, HTMXTemplate
-from litestar.datastructures import State
-from litestar.enums import RequestEncodingType
+from litestar.datastructures import State, UploadFile
+from litestar.enums import MediaType, RequestEncodingType, ScopeType
 from litestar.exceptions import HTTPException
 from litestar.logging import LoggingConfig
-from litestar.params import Body
+from litestar.middleware import AbstractMiddleware
+from litestar.params import Body, Parameter
 from litestar.response import Redirect, Template
 from litestar.static_files import create_static_files_router
-from litestar.status_codes import HTTP_303_SEE_OTHER, HTTP_404_NOT_FOUND
-
-from feedbasket import config
-from feedbasket.database import close_db_pool, init_db, queries
-from feedbasket.feedfinder import find_feed
-from feedbasket.models import Feed, FeedEntry, FeedForm
-from feedbasket.scraper import FeedScraper
-from feedbasket.template import template_config
+from litestar.status_codes import (
+    HTTP_303_SEE_OTHER,
+    HTTP_304_NOT_MODIFIED,
+    HTTP_404_NOT_FOUND,
+)
+from litestar.types import Message, Receive, Scope, Send
+from markupsafe import Markup
+
+from feedbasket import cache, config, metrics
+from feedbasket.database import (
+    CACHE_CHANNEL,
+    SCRAPE_CHANNEL,
+    Listener,
+    close_db_pool,
+    init_db,
+    invalidate_cache,
+    queries,
+)
+from feedbasket.extractor import ContentExtractor
+from feedbasket.feedfinder import DiscoveryCache
+from feedbasket.importer import FeedImporter, read_feeds
+from feedbasket.models import EntryItem, Feed, FeedForm
+from feedbasket.scraper import FeedScraper, run_forever
+from feedbasket.template import render_template, template_config
 
 
 @asynccontextmanager
 async def lifespan(app: Litestar):
     await init_db(app, queries)
-    asyncio.create_task(scrape_feeds(app.state.pool))
+    # Shared by request handlers that reach out to other sites.
+    app.state.http_session = ClientSession()
+    if config.DISCOVERY_CACHE_PERSIST:
+        app.state.discovery = DiscoveryCache(app.state.pool, queries)
+        await app.state.discovery.purge_expired()
+    else:
+        app.state.discovery = DiscoveryCache()
+    # Scrapers and other web processes tell us when cached pages went stale.
+    # Our own notifications come back too, invalidating once more is harmless.
+    channels = {CACHE_CHANNEL: lambda names: cache.invalidate(*names.split(","))}
+    wakeup = asyncio.Event()
+    tasks = []
+    if config.EMBEDDED_SCRAPER:
+        app.state.scraper = FeedScraper(app.state.pool, queries)
+        channels[SCRAPE_CHANNEL] = lambda _: wakeup.set()
+        tasks.append(asyncio.create_task(scrape_feeds(app.state.scraper, wakeup)))
+
+    def catch_up() -> None:
+        # Notifications sent while the listener was disconnected are lost.
+        cache.invalidate("entries", "feeds")
+        wakeup.set()
+
+    app.state.listener = Listener(app.state.pool, channels, on_reconnect=catch_up)
+    await app.state.listener.start()
+    if config.EXTRACT_CONTENT:
+        tasks.append(asyncio.create_task(extract_contents(app.state.pool)))
     yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if config.EMBEDDED_SCRAPER:
+        app.state.scraper.close()
+    await app.state.listener.close()
+    await app.state.http_session.close()
     await close_db_pool(app)
 
 
-async def scrape_feeds(db_pool: Pool) -> None:
-    """Fetch and parse the feeds periodically."""
+async def scrape_feeds(scraper: FeedScraper, wakeup: asyncio.Event) -> None:
+    """Fetch and parse the feeds that are due in the web process, when not run
+    as a separate worker, see scraper.py."""
     await asyncio.sleep(1)
-    scraper = FeedScraper(db_pool, queries)
-    while True:
-        await scraper.run()
-        await asyncio.sleep(config.FETCH_INTERVAL_SEC)
+    await run_forever(scraper, wakeup)
 
 
-@get("/")
-async def index(state: State) -> Template:
+async def request_scrape(state: State) -> None:
+    """Have a scraper pick up newly due feeds now, rather than on its next tick."""
     async with state.pool.acquire() as conn:
-        entry_count = await queries.get_entry_count(conn)
-        entries = [FeedEntry(**entry) for entry in await queries.get_entries(conn)]
+        await queries.notify(conn, channel=SCRAPE_CHANNEL, payload="")
+
+
+async def extract_contents(db_pool: Pool) -> None:
+    """Extract full-text content of queued entries in the background."""
+    extractor = ContentExtractor(db_pool, queries)
+    await extractor.run()
+
+
+async def get_entries_page(
+    conn: Connection,
+    published_before: datetime | None = None,
+    id_before: int | None = None,
+) -> tuple[list[EntryItem], bool]:
+    """Fetch a page of the home timeline, keyset-paginated on
+    (published_date, entry_id). Returns the entries and whether more follow."""
+    limit = config.ENTRIES_PAGE_SIZE + 1
+    if published_before is None or id_before is None:
+        rows = await queries.get_entries(conn, limit=limit)
+    else:
+        rows = await queries.get_entries_before(
+            conn, published_date=published_before, entry_id=id_before, limit=limit
+        )
+    entries = [EntryItem(**entry) for entry in rows[: config.ENTRIES_PAGE_SIZE]]
+    return entries, len(rows) == limit
+
+
+async def get_sidebar(conn: Connection) -> Markup:
+    """Rendered tag list of the home page, only changes with feed edits."""
+    key = ("sidebar", *cache.version("feeds"))
+    sidebar = cache.fragments.get(key)
+    if sidebar is None:
         tags_feeds = await queries.get_tags_feeds(conn)
-        context = {
-            "entries": entries,
-            "entry_count": entry_count,
-            "tags_feeds": tags_feeds,
-        }
-    return Template(template_name="index.html", context=context)
+        sidebar = render_template("index_sidebar.html", {"tags_feeds": tags_feeds})
+        cache.fragments.set(key, sidebar, len(sidebar))
+    # Rendered with autoescape, safe to include as is.
+    return Markup(sidebar)  # noqa: S704
+
+
+async def cached_page(
+    request: Request, key: tuple, render: Callable[[], Awaitable[str]]
+) -> Response:
+    """Serve a page from the page cache, rendering it on a miss. Keys include the
+    data versions the page depends on, and the TTL keeps relative dates fresh.
+    Browsers revalidate with the ETag and get an empty 304 if nothing changed."""
+    page = cache.pages.get(key)
+    if page is None:
+        body = await render()
+        etag = f'"{hashlib.blake2b(body.encode(), digest_size=16).hexdigest()}"'
+        page = body, etag
+        cache.pages.set(key, page, len(body), ttl=config.PAGE_CACHE_TTL_SEC)
+
+    body, etag = page
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("If-None-Match", ""):
+        return Response(content=b"", status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type=MediaType.HTML, headers=headers)
+
+
+@get("/")
+async def index(state: State, request: Request) -> Response:
+    async def render() -> str:
+        async with state.pool.acquire() as conn:
+            entry_count = await queries.get_entry_count(conn)
+            entries, has_more = await get_entries_page(conn)
+            context = {
+                "entries": entries,
+                "has_more": has_more,
+                "entry_count": entry_count,
+                "sidebar": await get_sidebar(conn),
+            }
+        return render_template("index.html", context)
+
+    key = ("index", *cache.version("entries", "feeds"))
+    return await cached_page(request, key, render)
+
+
+@get("/entries")
+async def entries_page(
+    state: State, request: Request, published_before: datetime, id_before: int
+) -> Response:
+    """Next page of the home timeline, loaded by HTMX on scroll."""
+
+    async def render() -> str:
+        async with state.pool.acquire() as conn:
+            entries, has_more = await get_entries_page(
+                conn, published_before, id_before
+            )
+        context = {"entries": entries, "has_more": has_more}
+        return render_template("entries_page.html", context)
+
+    key = (
+        "entries",
+        published_before,
+        id_before,
+        *cache.version("entries", "feeds"),
+    )
+    return await cached_page(request, key, render)
+
+
+@get("/metrics", media_type="text/plain; version=0.0.4", include_in_schema=False)
+async def get_metrics() -> str:
+    """Prometheus scrape endpoint."""
+    return metrics.render_metrics()
+
+
+@get("/search")
+async def search(
+    state: State,
+    request: HTMXRequest,
+    q: str = "",
+    page: Annotated[int, Parameter(ge=1)] = 1,
+) -> Template:
+    """Full-text search over entries, ranked by relevance. HTMX requests (typing
+    in the search box, scrolling) get just the results fragment."""
+    entries, has_more = [], False
+    if q.strip():
+        limit = config.ENTRIES_PAGE_SIZE + 1
+        async with state.pool.acquire() as conn:
+            rows = await queries.search_entries(
+                conn,
+                query=q,
+                limit=limit,
+                offset=(page - 1) * config.ENTRIES_PAGE_SIZE,
+            )
+        entries = [EntryItem(**entry) for entry in rows[: config.ENTRIES_PAGE_SIZE]]
+        has_more = len(rows) == limit
+
+    context = {
+        "entries": entries,
+        "has_more": has_more,
+        "query": q,
+        "next_page": page + 1,
+    }
+    template_name = "search_page.html" if request.htmx else "search.html"
+    return Template(template_name=template_name, context=context)
 
 
 class FavouritesController(Controller):
@@ -70,6 +252,7 @@ class FavouritesController(Controller):
     async def mark_as_favorite(self, state: State, entry_id: int) -> Template:
         async with state.pool.acquire() as conn:
             await queries.mark_as_favourite(conn, entry_id)
+        await invalidate_cache(state.pool, "entries")
         return Template(
             "svg_star_filled.html", context={"entry": {"entry_id": entry_id}}
         )
@@ -85,6 +268,7 @@ class FavouritesController(Controller):
 
         async with state.pool.acquire() as conn:
             await queries.unmark_as_favourite(conn, entry_id)
+        await invalidate_cache(state.pool, "entries")
 
         if request.htmx.current_url and "favourites" in request.htmx.current_url:
             # return HTMXTemplate(content="", re_target="closest #feed-entry") ??
@@ -99,17 +283,21 @@ class FavouritesController(Controller):
         )
 
     @get()
-    async def get_favourites(self, state: State) -> Template:
-        async with state.pool.acquire() as conn:
-            fav_count = await queries.get_favourite_count(conn)
-            entries = [
-                FeedEntry(**entry) for entry in await queries.get_favourites(conn)
-            ]
-            context = {
-                "entries": entries,
-                "fav_count": fav_count,
-            }
-        return Template("favourites.html", context=context)
+    async def get_favourites(self, state: State, request: Request) -> Response:
+        async def render() -> str:
+            async with state.pool.acquire() as conn:
+                fav_count = await queries.get_favourite_count(conn)
+                entries = [
+                    EntryItem(**entry) for entry in await queries.get_favourites(conn)
+                ]
+                context = {
+                    "entries": entries,
+                    "fav_count": fav_count,
+                }
+            return render_template("favourites.html", context)
+
+        key = ("favourites", *cache.version("entries"))
+        return await cached_page(request, key, render)
 
 
 class SubscriptionsController(Controller):
@@ -137,7 +325,7 @@ class SubscriptionsController(Controller):
         state: State,
         data: Annotated[dict, Body(media_type=RequestEncodingType.URL_ENCODED)],
     ) -> Template | Response:
-        response = find_feed(data["url"])
+        response = await state.discovery.find_feed(state.http_session, data["url"])
         if not response:
             return Response(content="feed could not be found.")
 
@@ -190,10 +378,33 @@ class SubscriptionsController(Controller):
                         conn, feed_id=feed_id, tag_name=tag
                     )
 
-        scraper = FeedScraper(state.pool, queries)
-        await scraper.run(data.feed_url)
+        # New feeds are due right away, have a scraper pick it up now.
+        await invalidate_cache(state.pool, "feeds")
+        await request_scrape(state)
         return Redirect(path="/")
 
+    @post(path="/import")
+    async def import_feeds(
+        self,
+        state: State,
+        data: Annotated[UploadFile, Body(media_type=RequestEncodingType.MULTI_PART)],
+    ) -> Response:
+        """Import an OPML file, or a list of site or feed URLs to discover."""
+        importer = FeedImporter(
+            state.pool, queries, state.http_session, state.discovery
+        )
+        try:
+            feeds, is_opml = read_feeds(data.file)
+            result = await importer.import_feeds(feeds, discover=not is_opml)
+        except (ElementTree.ParseError, DefusedXmlException):
+            return Response(content="Could not read the OPML file.")
+        finally:
+            await data.close()
+
+        await invalidate_cache(state.pool, "feeds")
+        await request_scrape(state)
+        return Response(content=str(result))
+
     @get(path="/{feed_id:int}/edit")
     async def view_feed_info(self, feed_id: int, state: State) -> Template:
         async with state.pool.acquire() as conn:
@@ -262,6 +473,7 @@ class SubscriptionsController(Controller):
 
             await queries.delete_unused_tags(conn)
 
+        await invalidate_cache(state.pool, "feeds")
         # TODO: returns just the fragment instead of rendering the whole page
         return Redirect(path=f"/subscriptions/{feed_id}/edit")
 
@@ -279,6 +491,7 @@ class SubscriptionsController(Controller):
             await queries.toggle_mute_feed(
                 conn, feed_id=feed_id, muted=data["mute-feed"]
             )
+        await invalidate_cache(state.pool, "feeds")
 
     @delete(path="/{feed_id:int}", status_code=HTTP_303_SEE_OTHER)
     async def unsubscribe(self, state: State, feed_id: int) -> ClientRedirect:
@@ -287,6 +500,7 @@ class SubscriptionsController(Controller):
             await queries.favourites_unsubscribe(conn, feed_id)
             await queries.feed_unsubscribe(conn, feed_id)
             await queries.delete_unused_tags(conn)
+        await invalidate_cache(state.pool, "entries", "feeds")
         return ClientRedirect(redirect_to="/subscriptions")
 
 
@@ -298,6 +512,35 @@ logging_config = LoggingConfig(
 )
 
 
+class MetricsMiddleware(AbstractMiddleware):
+    """Records the duration of each request per route handler."""
+
+    scopes: ClassVar[set[ScopeType]] = {ScopeType.HTTP}
+    exclude: ClassVar[list[str]] = ["^/metrics", "^/static"]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Label by handler, not path, to keep ids out of the label values.
+            handler = getattr(scope.get("route_handler"), "handler_name", None)
+            metrics.HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                handler=handler or "unknown",
+                status=str(status),
+            )
+
+
 def exception_handler(_: Request, exc: Exception) -> Template:
     return Template(
         "error.html",
@@ -312,8 +555,12 @@ app = Litestar(
         FavouritesController,
         SubscriptionsController,
         index,
+        entries_page,
+        search,
+        get_metrics,
         create_static_files_router(path="/static", directories=["./feedbasket/static"]),
     ],
+    middleware=[MetricsMiddleware],
     template_config=template_config,
     logging_config=logging_config,
     exception_handlers={HTTPException: exception_handler},
@@ -0,0 +1,239 @@
+"""Minimal Prometheus-style metrics, rendered in the text exposition format."""
+
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from collections.abc import Container
+from types import SimpleNamespace
+
+from aiohttp import (
+    ClientSession,
+    TraceConfig,
+    TraceConnectionCreateEndParams,
+    TraceConnectionCreateStartParams,
+    TraceDnsResolveHostEndParams,
+    TraceDnsResolveHostStartParams,
+    TraceRequestEndParams,
+    TraceRequestStartParams,
+)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+class Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        REGISTRY.append(self)
+
+    @abstractmethod
+    def _samples(self) -> list[str]: ...
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: dict[tuple, float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        self._values[tuple(sorted(labels.items()))] += amount
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(labels)} {value}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[tuple(sorted(labels.items()))] = value
+
+    def prune(self, label: str, keep: Container[str]) -> None:
+        """Drop the series with a value of `label` other than those in `keep`."""
+        for labels in list(self._values):
+            value = dict(labels).get(label)
+            if value is not None and value not in keep:
+                del self._values[labels]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self._buckets = buckets
+        self._counts: dict[tuple, list[int]] = {}
+        self._sums: dict[tuple, float] = defaultdict(float)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        counts = self._counts.setdefault(key, [0] * (len(self._buckets) + 1))
+        for i, bound in enumerate(self._buckets):
+            if value <= bound:
+                counts[i] += 1
+        counts[-1] += 1
+        self._sums[key] += value
+
+    def _samples(self) -> list[str]:
+        samples = []
+        for labels, counts in self._counts.items():
+            bounds = [*(str(bound) for bound in self._buckets), "+Inf"]
+            for bound, count in zip(bounds, counts, strict=True):
+                bucket_labels = _format_labels((*labels, ("le", bound)))
+                samples.append(f"{self.name}_bucket{bucket_labels} {count}")
+            label_str = _format_labels(labels)
+            samples.append(f"{self.name}_sum{label_str} {self._sums[labels]}")
+            samples.append(f"{self.name}_count{label_str} {counts[-1]}")
+        return samples
+
+
+REGISTRY: list[Metric] = []
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+FETCH_PHASE_SECONDS = Histogram(
+    "feedbasket_fetch_phase_seconds",
+    "Time spent per scrape phase: dns, connect, ttfb, download, parse, db_write.",
+)
+FEED_PHASE_SECONDS = Gauge(
+    "feedbasket_feed_phase_seconds",
+    "Time spent per scrape phase in the last scrape of each feed.",
+)
+FETCH_RESPONSES = Counter(
+    "feedbasket_fetch_responses_total", "Feed fetch responses by HTTP status."
+)
+FETCH_BYTES = Counter("feedbasket_fetch_bytes_total", "Feed body bytes downloaded.")
+RETRIES = Counter(
+    "feedbasket_retries_total", "Retried attempts of functions wrapped in @retry."
+)
+CIRCUIT_TRIPS = Counter(
+    "feedbasket_circuit_trips_total", "Times a per-host circuit breaker opened."
+)
+CIRCUIT_REJECTED = Counter(
+    "feedbasket_circuit_rejected_total", "Calls failed fast by an open circuit."
+)
+ENTRIES_PARSED = Counter(
+    "feedbasket_entries_parsed_total", "Entries parsed that could be new."
+)
+ENTRIES_INSERTED = Counter(
+    "feedbasket_entries_inserted_total", "Entries inserted into the database."
+)
+SCRAPE_CYCLE_SECONDS = Histogram(
+    "feedbasket_scrape_cycle_seconds",
+    "Duration of a scrape cycle.",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+SEEN_FILTER_CHECKS = Gauge(
+    "feedbasket_seen_filter_checks", "Lookups in the seen-URL filter."
+)
+SEEN_FILTER_HITS = Gauge("feedbasket_seen_filter_hits", "Hits in the seen-URL filter.")
+HTTP_REQUEST_SECONDS = Histogram(
+    "feedbasket_http_request_duration_seconds", "Duration of web requests."
+)
+
+
+def observe_phase(phase: str, seconds: float, feed_id: int | None = None) -> None:
+    FETCH_PHASE_SECONDS.observe(seconds, phase=phase)
+    if feed_id is not None:
+        FEED_PHASE_SECONDS.set(seconds, feed_id=str(feed_id), phase=phase)
+
+
+def prune_feeds(feed_ids: set[int]) -> None:
+    """Drop the per-feed series of feeds not in `feed_ids`, unsubscribed from."""
+    FEED_PHASE_SECONDS.prune("feed_id", {str(feed_id) for feed_id in feed_ids})
+
+
+def _trace_feed_id(context: SimpleNamespace) -> int | None:
+    trace_ctx = context.trace_request_ctx
+    return trace_ctx.get("feed_id") if isinstance(trace_ctx, dict) else None
+
+
+async def _on_request_start(
+    session: ClientSession, context: SimpleNamespace, params: TraceRequestStartParams
+) -> None:
+    context.request_start = time.perf_counter()
+
+
+async def _on_dns_start(
+    session: ClientSession,
+    context: SimpleNamespace,
+    params: TraceDnsResolveHostStartParams,
+) -> None:
+    context.dns_start = time.perf_counter()
+
+
+async def _on_dns_end(
+    session: ClientSession,
+    context: SimpleNamespace,
+    params: TraceDnsResolveHostEndParams,
+) -> None:
+    elapsed = time.perf_counter() - context.dns_start
+    observe_phase("dns", elapsed, _trace_feed_id(context))
+
+
+async def _on_connection_start(
+    session: ClientSession,
+    context: SimpleNamespace,
+    params: TraceConnectionCreateStartParams,
+) -> None:
+    context.connection_start = time.perf_counter()
+
+
+async def _on_connection_end(
+    session: ClientSession,
+    context: SimpleNamespace,
+    params: TraceConnectionCreateEndParams,
+) -> None:
+    elapsed = time.perf_counter() - context.connection_start
+    observe_phase("connect", elapsed, _trace_feed_id(context))
+
+
+async def _on_request_end(
+    session: ClientSession, context: SimpleNamespace, params: TraceRequestEndParams
+) -> None:
+    # Fired once the response headers are in, before the body is read.
+    elapsed = time.perf_counter() - context.request_start
+    observe_phase("ttfb", elapsed, _trace_feed_id(context))
+    FETCH_RESPONSES.inc(status=str(params.response.status))
+
+
+def trace_config() -> TraceConfig:
+    """aiohttp tracing hooks that time the phases of each feed request.
+    Pass trace_request_ctx={"feed_id": ...} to attribute timings to a feed."""
+    config = TraceConfig()
+    config.on_request_start.append(_on_request_start)
+    config.on_dns_resolvehost_start.append(_on_dns_start)
+    config.on_dns_resolvehost_end.append(_on_dns_end)
+    config.on_connection_create_start.append(_on_connection_start)
+    config.on_connection_create_end.append(_on_connection_end)
+    config.on_request_end.append(_on_request_end)
+    return config
@@ -1,9 +1,3 @@
--- name: create-schema#
-DROP TABLE IF EXISTS feed_tags;
-DROP TABLE IF EXISTS tags;
-DROP TABLE IF EXISTS entries;
-DROP TABLE IF EXISTS feeds;
-
 CREATE TABLE IF NOT EXISTS feeds (
     feed_id SERIAL PRIMARY KEY,
     feed_url TEXT UNIQUE NOT NULL,
@@ -14,7 +8,7 @@ CREATE TABLE IF NOT EXISTS feeds (
     etag_header TEXT,
     muted BOOLEAN DEFAULT FALSE,
     last_modified_header TEXT,
-    parsing_error_count INT DEFAULT 0, 
+    parsing_error_count INT DEFAULT 0,
     created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -30,7 +24,7 @@ CREATE TABLE IF NOT EXISTS entries (
     cleaned_content TEXT,
     is_favourite BOOLEAN DEFAULT FALSE,
     created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
-    feed_id INT REFERENCES feeds (feed_id) 
+    feed_id INT REFERENCES feeds (feed_id)
     -- viewed BOOLEAN,
     -- icon_url TEXT,
     -- updated TIMESTAMP,
@@ -0,0 +1,5 @@
+ALTER TABLE feeds
+    ADD COLUMN IF NOT EXISTS fetch_interval_sec INT NOT NULL DEFAULT 1800,
+    ADD COLUMN IF NOT EXISTS next_fetch_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS feeds_next_fetch_at_idx ON feeds (next_fetch_at);
@@ -0,0 +1,93 @@
+-- Counters kept up to date by statement-level triggers, so that page loads
+-- read a single row instead of counting the tables.
+
+CREATE TABLE IF NOT EXISTS stats (
+    stat_name TEXT PRIMARY KEY,
+    stat_value BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO stats (stat_name, stat_value)
+VALUES
+    ('entry_count', (SELECT COUNT(*) FROM entries)),
+    ('favourite_count', (SELECT COUNT(*) FROM entries WHERE is_favourite = TRUE)),
+    ('feed_count', (SELECT COUNT(*) FROM feeds)),
+    ('unreachable_feed_count', (SELECT COUNT(*) FROM feeds WHERE parsing_error_count >= 5))
+ON CONFLICT (stat_name) DO UPDATE SET stat_value = EXCLUDED.stat_value;
+
+CREATE OR REPLACE FUNCTION bump_stat(counter TEXT, delta BIGINT) RETURNS VOID AS $$
+    UPDATE stats SET stat_value = stat_value + delta
+    WHERE stat_name = counter AND delta <> 0;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION entries_stats() RETURNS TRIGGER AS $$
+DECLARE
+    entry_delta BIGINT DEFAULT 0;
+    favourite_delta BIGINT DEFAULT 0;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT entry_delta + COUNT(*),
+               favourite_delta + COUNT(*) FILTER (WHERE is_favourite)
+        INTO entry_delta, favourite_delta
+        FROM new_rows;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        SELECT entry_delta - COUNT(*),
+               favourite_delta - COUNT(*) FILTER (WHERE is_favourite)
+        INTO entry_delta, favourite_delta
+        FROM old_rows;
+    END IF;
+    -- Always bump in the same order to avoid deadlocks between statements.
+    PERFORM bump_stat('entry_count', entry_delta);
+    PERFORM bump_stat('favourite_count', favourite_delta);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION feeds_stats() RETURNS TRIGGER AS $$
+DECLARE
+    feed_delta BIGINT DEFAULT 0;
+    unreachable_delta BIGINT DEFAULT 0;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT feed_delta + COUNT(*),
+               unreachable_delta + COUNT(*) FILTER (WHERE parsing_error_count >= 5)
+        INTO feed_delta, unreachable_delta
+        FROM new_rows;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        SELECT feed_delta - COUNT(*),
+               unreachable_delta - COUNT(*) FILTER (WHERE parsing_error_count >= 5)
+        INTO feed_delta, unreachable_delta
+        FROM old_rows;
+    END IF;
+    PERFORM bump_stat('feed_count', feed_delta);
+    PERFORM bump_stat('unreachable_feed_count', unreachable_delta);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables can only be declared on single-event triggers.
+
+CREATE TRIGGER entries_stats_insert AFTER INSERT ON entries
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION entries_stats();
+
+CREATE TRIGGER entries_stats_update AFTER UPDATE ON entries
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION entries_stats();
+
+CREATE TRIGGER entries_stats_delete AFTER DELETE ON entries
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION entries_stats();
+
+CREATE TRIGGER feeds_stats_insert AFTER INSERT ON feeds
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION feeds_stats();
+
+CREATE TRIGGER feeds_stats_update AFTER UPDATE ON feeds
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION feeds_stats();
+
+CREATE TRIGGER feeds_stats_delete AFTER DELETE ON feeds
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION feeds_stats();
@@ -0,0 +1,15 @@
+-- Home timeline, keyset-paginated on (published_date, entry_id).
+CREATE INDEX IF NOT EXISTS entries_published_date_idx
+    ON entries (published_date DESC, entry_id DESC);
+
+-- Favourites page, a small subset of entries.
+CREATE INDEX IF NOT EXISTS entries_favourites_idx
+    ON entries (published_date DESC)
+    WHERE is_favourite = TRUE;
+
+-- Latest entry of a feed and per-feed deletes/updates on unsubscribe.
+CREATE INDEX IF NOT EXISTS entries_feed_id_published_date_idx
+    ON entries (feed_id, published_date DESC);
+
+-- Unused tag cleanup looks feed_tags up by tag.
+CREATE INDEX IF NOT EXISTS feed_tags_tag_id_idx ON feed_tags (tag_id);
@@ -0,0 +1,10 @@
+-- Work queue for full-text extraction of new entries, claimed with SKIP LOCKED.
+CREATE TABLE IF NOT EXISTS extraction_jobs (
+    entry_id INT PRIMARY KEY REFERENCES entries (entry_id) ON DELETE CASCADE,
+    attempts INT NOT NULL DEFAULT 0,
+    claimed_until TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS extraction_jobs_created_at_idx
+    ON extraction_jobs (created_at);
@@ -0,0 +1,14 @@
+-- Full-text search over entries. Long bodies are truncated to stay within
+-- the tsvector size limit.
+ALTER TABLE entries
+    ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(entry_title, '')), 'A')
+        || setweight(to_tsvector('english', left(coalesce(summary, ''), 100000)), 'B')
+        || setweight(to_tsvector('english', left(coalesce(content, ''), 100000)), 'C')
+        || setweight(
+            to_tsvector('english', left(coalesce(cleaned_content, ''), 100000)), 'C'
+        )
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS entries_search_vector_idx
+    ON entries USING GIN (search_vector);
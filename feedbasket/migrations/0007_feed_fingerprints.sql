@@ -0,0 +1,5 @@
+-- Hash of the last fetched feed body and fingerprints of the entries in it,
+-- to skip unchanged feeds and already seen entries.
+ALTER TABLE feeds
+    ADD COLUMN IF NOT EXISTS content_hash TEXT,
+    ADD COLUMN IF NOT EXISTS entry_fingerprints BIGINT[];
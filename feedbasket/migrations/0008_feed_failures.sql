@@ -0,0 +1,5 @@
+-- When a feed started failing and why, so chronically unreachable feeds can be
+-- demoted. Both are cleared on the next successful fetch.
+ALTER TABLE feeds
+    ADD COLUMN IF NOT EXISTS failing_since TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS last_error TEXT;
@@ -0,0 +1,10 @@
+-- Feed discovery results by normalized site URL, so they survive restarts.
+-- A NULL feed_url records that no feed was found.
+CREATE TABLE IF NOT EXISTS discovery_cache (
+    site_url TEXT PRIMARY KEY,
+    feed_url TEXT,
+    feed_name TEXT,
+    feed_type TEXT,
+    icon_url TEXT,
+    expires_at TIMESTAMPTZ NOT NULL
+);
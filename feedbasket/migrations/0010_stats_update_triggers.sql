@@ -0,0 +1,30 @@
+-- The statement-level update triggers from 0003 fired on every update of
+-- entries and feeds, e.g. lease claims, feed metadata and extraction saves.
+-- Transition tables cannot be used with column lists, so updates are counted
+-- by row-level triggers on the columns the counters depend on instead.
+-- Updates never change entry_count or feed_count.
+
+DROP TRIGGER IF EXISTS entries_stats_update ON entries;
+DROP TRIGGER IF EXISTS feeds_stats_update ON feeds;
+
+CREATE OR REPLACE FUNCTION entries_favourite_stats() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_stat('favourite_count', CASE WHEN NEW.is_favourite IS TRUE THEN 1 ELSE -1 END);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION feeds_unreachable_stats() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_stat('unreachable_feed_count', CASE WHEN COALESCE(NEW.parsing_error_count, 0) >= 5 THEN 1 ELSE -1 END);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER entries_stats_update AFTER UPDATE OF is_favourite ON entries
+FOR EACH ROW WHEN ((OLD.is_favourite IS TRUE) <> (NEW.is_favourite IS TRUE))
+EXECUTE FUNCTION entries_favourite_stats();
+
+CREATE TRIGGER feeds_stats_update AFTER UPDATE OF parsing_error_count ON feeds
+FOR EACH ROW WHEN ((COALESCE(OLD.parsing_error_count, 0) >= 5) <> (COALESCE(NEW.parsing_error_count, 0) >= 5))
+EXECUTE FUNCTION feeds_unreachable_stats();
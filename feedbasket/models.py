@@ -44,6 +44,12 @@ class Feed(BaseModel):
     muted: bool
     last_modified_header: str | None
     parsing_error_count: int
+    failing_since: datetime | None = None
+    last_error: str | None = None
+    fetch_interval_sec: int
+    next_fetch_at: datetime
+    content_hash: str | None = None
+    entry_fingerprints: list[int] | None = None
     created_at: datetime
     tags: list[str | None] | None = None
 
@@ -72,6 +78,8 @@ class NewFeedEntry(BaseModel):
 
     @staticmethod
     def parse_date(value):
+        if isinstance(value, datetime):
+            return value
         try:
             return datetime.fromtimestamp(time.mktime(value), UTC)
         except (ValueError, TypeError):
@@ -123,3 +131,16 @@ class FeedEntry:
     is_favourite: bool
     created_at: datetime
     feed_id: int | None  # saved entries after feed deletion
+
+
+@dataclass
+class EntryItem:
+    """Represents an entry in a paginated entry list.
+    Holds only the columns rendered by 'entry_item.html'."""
+
+    entry_id: int
+    entry_title: str
+    entry_url: str
+    author: str | None
+    published_date: datetime
+    is_favourite: bool
@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import UTC, datetime
+
+from feedbasket import config
+
+log = logging.getLogger(__name__)
+
+# Entries cross the process boundary as plain tuples in this field order,
+# with dates as UTC timestamps.
+ENTRY_FIELDS = (
+    "entry_title",
+    "entry_url",
+    "author",
+    "summary",
+    "content",
+    "published_date",
+    "updated_date",
+)
+EntryRow = tuple[
+    str | None, str | None, str | None, str | None, str | None, float, float | None
+]
+
+
+def fingerprint(value: str) -> int:
+    """64-bit fingerprint of an entry id or URL, as stored in a BIGINT."""
+    digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _timestamp(value: time.struct_time | None) -> float | None:
+    try:
+        return datetime.fromtimestamp(time.mktime(value), UTC).timestamp()
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def parse_feed(
+    feed_xml: bytes,
+    content_type: str | None,
+    last_updated: datetime | None,
+    seen_fingerprints: frozenset[int],
+) -> tuple[list[EntryRow], list[int]]:
+    """Parse a feed body into rows of entries that can still be new, skipping
+    entries seen in the previous fetch. Also returns the fingerprints of all
+    entries in the feed. Runs in a worker process of the ParseEngine."""
+    # Imported on first use, so only the parse worker processes load it.
+    import feedparser
+
+    response_headers = {"content-type": content_type} if content_type else None
+    feed_data = feedparser.parse(feed_xml, response_headers=response_headers)
+    current_datetime_utc = datetime.now(UTC)
+
+    # Some feeds have incorrect published date that does not match the lastest entry date.
+    # Can't use it to skip parsing the entries if server also ignores the etag and last-modified headers.
+
+    # if feed_published := feed_data.feed.get("updated_parsed"):
+    #     feed_published_datetime = datetime.fromtimestamp(
+    #         time.mktime(feed_published)
+    #     )
+    #     if last_updated and feed_published_datetime < last_updated:
+    #         log.debug(f"Skipping feed: no new entries. {feed_data.feed.link}")
+    #         return
+
+    #     if (
+    #         current_datetime_utc - feed_published_datetime
+    #     ).days > config.SKIP_OLDER_THAN_DAYS:
+    #         log.debug(f"Skipping feed: too old., {feed_data.feed.link}")
+    #         return
+
+    entries = []
+    fingerprints = []
+    for entry in feed_data.entries:
+        if key := entry.get("id") or entry.get("link"):
+            entry_fingerprint = fingerprint(key)
+            fingerprints.append(entry_fingerprint)
+            if entry_fingerprint in seen_fingerprints:
+                log.debug("Skipping entry: seen in previous fetch.")
+                continue
+
+        published = entry.get("published_parsed", entry.get("updated_parsed"))
+        published = _timestamp(published)
+        if published is None:
+            log.debug("Skipping entry: invalid/no publication date.")
+            continue
+        published_datetime = datetime.fromtimestamp(published, UTC)
+
+        age_in_days = (current_datetime_utc - published_datetime).days
+        if age_in_days > config.SKIP_OLDER_THAN_DAYS:
+            log.debug(f"Skipping entry: older than {config.SKIP_OLDER_THAN_DAYS} days.")
+            continue
+
+        # Skip if last_updated is not None and published before last fetch: for feeds that ignore etag/last_modified
+        if last_updated and published_datetime < last_updated:
+            log.debug("Skipping entry: duplicate.")
+            continue
+
+        entries.append(
+            (
+                entry.get("title"),
+                entry.get("link"),
+                entry.get("author"),
+                entry.get("summary"),
+                entry.get("content")[0].get("value") if entry.get("content") else None,
+                published,
+                _timestamp(entry.get("updated_parsed")),
+            )
+        )
+    return entries, fingerprints
+
+
+class ParseError(Exception):
+    pass
+
+
+class ParseEngine:
+    """Runs feedparser in a reusable pool of worker processes, so that parsing
+    scales across cores and stays off the event loop serving web requests."""
+
+    def __init__(self, workers: int = config.PARSE_WORKERS):
+        self._workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawn rather than fork a process that runs an event loop.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def parse(
+        self,
+        feed_xml: bytes,
+        content_type: str | None,
+        last_updated: datetime | None,
+        seen_fingerprints: frozenset[int],
+    ) -> tuple[list[EntryRow], list[int]]:
+        """Parse a feed in a worker process. Raises ParseError if the worker
+        died, rather than returning no entries, so that the feed is not marked
+        as read."""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(
+                executor,
+                parse_feed,
+                feed_xml,
+                content_type,
+                last_updated,
+                seen_fingerprints,
+            )
+        except BrokenProcessPool as e:
+            # Other parses of the broken pool fail here too, by then the pool
+            # may have been replaced and must be left alone.
+            if executor is self._executor:
+                log.error("Parse worker died, restarting the pool.")
+                self.close()
+            raise ParseError("Parse worker died.") from e
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,20 @@
+-- name: get-discovery^
+SELECT feed_url, feed_name, feed_type, icon_url, expires_at
+FROM discovery_cache
+WHERE site_url = :site_url
+AND expires_at > NOW();
+
+-- name: save-discovery!
+INSERT INTO discovery_cache
+(site_url, feed_url, feed_name, feed_type, icon_url, expires_at)
+VALUES (:site_url, :feed_url, :feed_name, :feed_type, :icon_url, :expires_at)
+ON CONFLICT (site_url) DO UPDATE
+SET feed_url = EXCLUDED.feed_url,
+    feed_name = EXCLUDED.feed_name,
+    feed_type = EXCLUDED.feed_type,
+    icon_url = EXCLUDED.icon_url,
+    expires_at = EXCLUDED.expires_at;
+
+-- name: delete-expired-discoveries!
+DELETE FROM discovery_cache
+WHERE expires_at <= NOW();
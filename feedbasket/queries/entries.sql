@@ -1,25 +1,59 @@
--- name: insert-entry!
-INSERT INTO entries (
-    entry_title,
-    entry_url,
-    published_date,
-    updated_date,
-    author,
-    summary,
-    content,
-    feed_id,
-    cleaned_content
-) VALUES (
-    :entry_title,
-    :entry_url,
-    :published_date,
-    :updated_date,
-    :author,
-    :summary,
-    :content,
-    :feed_id,
-    :cleaned_content )
-ON CONFLICT (entry_url) DO NOTHING;
+-- name: insert-entries$
+WITH inserted AS (
+    INSERT INTO entries (
+        entry_title,
+        entry_url,
+        published_date,
+        updated_date,
+        author,
+        summary,
+        content,
+        feed_id,
+        cleaned_content
+    )
+    SELECT
+        e.entry_title,
+        e.entry_url,
+        e.published_date,
+        e.updated_date,
+        e.author,
+        e.summary,
+        e.content,
+        :feed_id,
+        e.cleaned_content
+    FROM UNNEST(
+        CAST(:entry_title AS TEXT[]),
+        CAST(:entry_url AS TEXT[]),
+        CAST(:published_date AS TIMESTAMPTZ[]),
+        CAST(:updated_date AS TIMESTAMPTZ[]),
+        CAST(:author AS TEXT[]),
+        CAST(:summary AS TEXT[]),
+        CAST(:content AS TEXT[]),
+        CAST(:cleaned_content AS TEXT[])
+    ) AS e (
+        entry_title,
+        entry_url,
+        published_date,
+        updated_date,
+        author,
+        summary,
+        content,
+        cleaned_content
+    )
+    ON CONFLICT (entry_url) DO NOTHING
+    RETURNING entry_id
+), queued AS (
+    INSERT INTO extraction_jobs (entry_id)
+    SELECT entry_id FROM inserted
+    WHERE CAST(:extract_content AS BOOLEAN)
+)
+SELECT COUNT(*) FROM inserted;
+
+-- name: get-recent-entry-urls
+SELECT feed_id, entry_url FROM entries
+WHERE feed_id IS NOT NULL
+ORDER BY entry_id DESC
+LIMIT :limit;
 
 -- name: get-entries
 SELECT
@@ -27,18 +61,43 @@ SELECT
     e.entry_title,
     e.entry_url,
     e.author,
-    e.summary,
-    e.content,
     e.published_date,
-    e.updated_date,
-    e.cleaned_content,
-    e.is_favourite,
-    e.created_at,
-    e.feed_id
+    e.is_favourite
+FROM entries e
+LEFT JOIN feeds f ON e.feed_id = f.feed_id
+WHERE (f.muted = FALSE or f.muted is null)
+AND e.published_date IS NOT NULL
+ORDER BY e.published_date DESC, e.entry_id DESC
+LIMIT :limit;
+
+-- name: get-entries-before
+SELECT
+    e.entry_id,
+    e.entry_title,
+    e.entry_url,
+    e.author,
+    e.published_date,
+    e.is_favourite
 FROM entries e
 LEFT JOIN feeds f ON e.feed_id = f.feed_id
-WHERE f.muted = FALSE or f.muted is null
-ORDER BY e.published_date DESC;
+WHERE (f.muted = FALSE or f.muted is null)
+AND (e.published_date, e.entry_id) < (:published_date, :entry_id)
+ORDER BY e.published_date DESC, e.entry_id DESC
+LIMIT :limit;
+
+-- name: search-entries
+SELECT
+    e.entry_id,
+    e.entry_title,
+    e.entry_url,
+    e.author,
+    e.published_date,
+    e.is_favourite
+FROM entries e, websearch_to_tsquery('english', :query) q
+WHERE e.search_vector @@ q
+ORDER BY ts_rank(e.search_vector, q) DESC, e.entry_id DESC
+LIMIT :limit
+OFFSET :offset;
 
 -- name: mark-as-favourite!
 UPDATE entries
@@ -51,16 +110,24 @@ SET is_favourite = FALSE
 WHERE entry_id = :entry_id
 
 -- name: get-favourites
-SELECT * FROM entries
+SELECT
+    entry_id,
+    entry_title,
+    entry_url,
+    author,
+    published_date,
+    is_favourite
+FROM entries
 WHERE is_favourite = TRUE
 ORDER BY published_date DESC
 
 -- name: get-entry-count$
-SELECT COUNT(*) FROM entries;
+SELECT stat_value FROM stats
+WHERE stat_name = 'entry_count';
 
 -- name: get-favourite-count$
-SELECT COUNT(*) FROM entries
-WHERE is_favourite = TRUE;
+SELECT stat_value FROM stats
+WHERE stat_name = 'favourite_count';
 
 -- name: get-latest-entry-date^
 SELECT published_date FROM entries
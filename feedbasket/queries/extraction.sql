@@ -0,0 +1,40 @@
+-- name: claim-extraction-jobs
+UPDATE extraction_jobs j
+SET attempts = j.attempts + 1,
+    claimed_until = NOW() + make_interval(secs => :lease_sec)
+FROM entries e
+WHERE j.entry_id IN (
+    SELECT entry_id
+    FROM extraction_jobs
+    WHERE (claimed_until IS NULL OR claimed_until < NOW())
+    AND attempts < :max_attempts
+    ORDER BY created_at
+    LIMIT :batch_size
+    FOR UPDATE SKIP LOCKED
+)
+AND e.entry_id = j.entry_id
+RETURNING j.entry_id, j.attempts, e.entry_url;
+
+-- name: delete-exhausted-extraction-jobs!
+-- Jobs out of attempts whose last claim expired without a result, such as
+-- when the worker crashed. They are never claimed again.
+DELETE FROM extraction_jobs
+WHERE attempts >= :max_attempts
+AND claimed_until < NOW();
+
+-- name: save-extracted-content!
+WITH results AS (
+    SELECT *
+    FROM UNNEST(
+        CAST(:entry_ids AS INT[]),
+        CAST(:cleaned_contents AS TEXT[])
+    ) AS r (entry_id, cleaned_content)
+), updated AS (
+    UPDATE entries e
+    SET cleaned_content = r.cleaned_content
+    FROM results r
+    WHERE e.entry_id = r.entry_id
+    AND r.cleaned_content IS NOT NULL
+)
+DELETE FROM extraction_jobs
+WHERE entry_id IN (SELECT entry_id FROM results);
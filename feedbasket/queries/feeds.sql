@@ -9,12 +9,43 @@ UPDATE feeds
 SET etag_header = :etag_header,
     last_modified_header = :last_modified_header,
     last_updated = :last_updated,
-    parsing_error_count = :parsing_error_count
+    parsing_error_count = :parsing_error_count,
+    failing_since = NULL,
+    last_error = NULL,
+    fetch_interval_sec = :fetch_interval_sec,
+    next_fetch_at = :next_fetch_at,
+    content_hash = :content_hash,
+    entry_fingerprints = :entry_fingerprints
 WHERE feed_url = :feed_url;
 
+-- name: update-feed-schedule!
+UPDATE feeds
+SET fetch_interval_sec = :fetch_interval_sec,
+    next_fetch_at = :next_fetch_at
+WHERE feed_id = :feed_id;
+
 -- name: get-all-feeds
 SELECT * FROM feeds;
 
+-- name: get-feed-ids
+SELECT feed_id FROM feeds;
+
+-- name: claim-due-feeds
+-- Lease a batch of due feeds to one scraper by pushing next_fetch_at past the
+-- lease, so concurrent scrapers skip them. Scraping a feed sets its real next
+-- fetch time, feeds of a scraper that died are due again once the lease ends.
+UPDATE feeds
+SET next_fetch_at = NOW() + make_interval(secs => :lease_sec)
+WHERE feed_id IN (
+    SELECT feed_id
+    FROM feeds
+    WHERE next_fetch_at <= NOW()
+    ORDER BY next_fetch_at
+    LIMIT :batch_size
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING *;
+
 -- name: get_feeds_with_tags
 SELECT
     f.feed_id,
@@ -27,6 +58,10 @@ SELECT
     f.muted,
     f.last_modified_header,
     f.parsing_error_count,
+    f.failing_since,
+    f.last_error,
+    f.fetch_interval_sec,
+    f.next_fetch_at,
     f.created_at,
     ARRAY_AGG(t.tag_name) AS tags
 FROM
@@ -46,7 +81,11 @@ WHERE feed_url = :feed_url;
 
 -- name: update-feed-error-count!
 UPDATE feeds
-SET parsing_error_count = parsing_error_count + 1
+SET parsing_error_count = parsing_error_count + 1,
+    failing_since = COALESCE(failing_since, NOW()),
+    last_error = :last_error,
+    fetch_interval_sec = :fetch_interval_sec,
+    next_fetch_at = :next_fetch_at
 WHERE feed_id = :feed_id;
 
 -- name: update-feed-name!
@@ -74,28 +113,19 @@ SELECT EXISTS (
 );
 
 -- name: get-feed-count$
-SELECT COUNT(*) FROM feeds;
+SELECT stat_value FROM stats
+WHERE stat_name = 'feed_count';
 
 -- name: get-unreachable-feed-count$
-SELECT COUNT(*) 
-FROM feeds
-WHERE parsing_error_count >= 5;
+SELECT stat_value FROM stats
+WHERE stat_name = 'unreachable_feed_count';
 
 -- name: get-inactive-feed-count$
-SELECT (
-    SELECT COUNT(*)
-    FROM feeds
-    WHERE last_updated < (CURRENT_DATE - INTERVAL '60 days')
-    ) + (
-    SELECT COUNT(*)
-    FROM feeds
-    WHERE last_updated IS NULL
-    )
-AS inactive_count;
-
--- SELECT COUNT(*)
--- FROM feeds
--- WHERE last_updated < (CURRENT_DATE - INTERVAL '60 days');
+-- Depends on the current date, so it is not kept as a counter.
+SELECT COUNT(*) AS inactive_count
+FROM feeds
+WHERE last_updated IS NULL
+OR last_updated < (CURRENT_DATE - INTERVAL '60 days');
 
 -- name: feed-unsubscribe!
 DELETE FROM feeds
@@ -111,3 +141,19 @@ UPDATE entries
 SET feed_id = NULL
 WHERE feed_id = :feed_id
 AND is_favourite = TRUE;
+
+-- name: insert-feeds$
+-- Bulk insert of imported feeds, returns how many were new.
+WITH inserted AS (
+    INSERT INTO feeds (feed_url, feed_name, feed_type, icon_url)
+    SELECT *
+    FROM UNNEST(
+        CAST(:feed_urls AS TEXT[]),
+        CAST(:feed_names AS TEXT[]),
+        CAST(:feed_types AS TEXT[]),
+        CAST(:icon_urls AS TEXT[])
+    )
+    ON CONFLICT (feed_url) DO NOTHING
+    RETURNING 1
+)
+SELECT COUNT(*) FROM inserted;
@@ -0,0 +1,16 @@
+-- name: lock-migrations$
+SELECT pg_advisory_xact_lock(:lock_id);
+
+-- name: create-migrations-table#
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    migration_name TEXT NOT NULL,
+    applied_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+-- name: get-applied-migrations
+SELECT version FROM schema_migrations;
+
+-- name: record-migration!
+INSERT INTO schema_migrations (version, migration_name)
+VALUES (:version, :migration_name);
@@ -0,0 +1,3 @@
+-- name: notify!
+-- Wake up the listeners of a channel, see database.listen.
+SELECT pg_notify(:channel, :payload);
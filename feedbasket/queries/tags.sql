@@ -41,3 +41,24 @@ WHERE tag_id NOT IN (
     SELECT tag_id
     FROM feed_tags
 );
+
+-- name: add-feed-tags!
+-- Bulk tagging of feeds by URL, creating missing tags.
+WITH pairs AS (
+    SELECT DISTINCT *
+    FROM UNNEST(CAST(:feed_urls AS TEXT[]), CAST(:tag_names AS TEXT[]))
+        AS p (feed_url, tag_name)
+),
+new_tags AS (
+    INSERT INTO tags (tag_name)
+    SELECT DISTINCT tag_name FROM pairs
+    ON CONFLICT (tag_name) DO NOTHING
+    RETURNING tag_id, tag_name
+)
+INSERT INTO feed_tags (feed_id, tag_id)
+SELECT f.feed_id, COALESCE(n.tag_id, t.tag_id)
+FROM pairs p
+JOIN feeds f ON f.feed_url = p.feed_url
+LEFT JOIN new_tags n ON n.tag_name = p.tag_name
+LEFT JOIN tags t ON t.tag_name = p.tag_name
+ON CONFLICT DO NOTHING;
@@ -31,24 +31,232 @@
 #################################
 
 import asyncio
+import codecs
 import json
 import logging
 import os
 import re
 from asyncio.subprocess import Process
-from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import count
 
-from aiohttp import ClientConnectorError, ClientResponseError, ClientSession
+from aiohttp import ClientError, ClientSession
 
 from feedbasket import config
 
 log = logging.getLogger(__name__)
 
+WORKER_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "readability", "extract_worker.js"
+)
 
-async def extract_content_readability(session: ClientSession, url: str) -> str | None:
-    # await install_npm_packages()
 
-    # async with ClientSession() as session:
+class WorkerExitedError(Exception):
+    def __init__(self, started: bool = True):
+        # Whether the worker had started on the job, rather than exiting while
+        # the job was still queued behind another one.
+        self.started = started
+
+
+@dataclass
+class _Job:
+    started: asyncio.Event = field(default_factory=asyncio.Event)
+    result: asyncio.Future = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future()
+    )
+
+
+class ReadabilityWorker:
+    """A long-lived node process running extract_worker.js.
+
+    Jobs are written to stdin as newline-delimited JSON and results are matched
+    back to their job by id, so several jobs can be in flight at once. The
+    worker runs them one at a time, in order: a job is started once the results
+    of all jobs sent before it are in."""
+
+    def __init__(self):
+        self._process: Process | None = None
+        self._reader: asyncio.Task | None = None
+        self._pending: dict[int, _Job] = {}
+        self._ids = count()
+        self.jobs_done = 0
+
+    @property
+    def load(self) -> int:
+        return len(self._pending)
+
+    async def start(self) -> None:
+        self._process = await asyncio.create_subprocess_exec(
+            "node",
+            WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=config.READABILITY_MAX_RESULT_BYTES,
+        )
+        self._reader = asyncio.create_task(self._read_results())
+
+    def _start_next(self) -> None:
+        if self._pending:
+            next(iter(self._pending.values())).started.set()
+
+    async def _read_results(self) -> None:
+        try:
+            while line := await self._process.stdout.readline():
+                result = json.loads(line)
+                job = self._pending.pop(result["id"], None)
+                if job and not job.result.done():
+                    job.result.set_result(result)
+                self._start_next()
+        except ValueError:
+            log.error("Invalid output from readability worker, stopping it.")
+            self._process.kill()
+        finally:
+            for job in self._pending.values():
+                if not job.result.done():
+                    job.result.set_exception(WorkerExitedError(job.started.is_set()))
+                job.started.set()
+            self._pending.clear()
+
+    async def extract(self, html: str, timeout: float) -> dict:
+        """Run a job. The timeout counts from when the worker starts on it, not
+        from when it was sent, so time spent queued is not held against it."""
+        job_id = next(self._ids)
+        job = self._pending[job_id] = _Job()
+        if len(self._pending) == 1:
+            job.started.set()
+        try:
+            line = json.dumps({"id": job_id, "html": html}).encode()
+            self._process.stdin.write(line + b"\n")
+            await self._process.stdin.drain()
+            await job.started.wait()
+            return await asyncio.wait_for(job.result, timeout)
+        except (BrokenPipeError, ConnectionResetError):
+            raise WorkerExitedError()
+        finally:
+            self._pending.pop(job_id, None)
+            self.jobs_done += 1
+
+    async def close(self, graceful: bool = True) -> None:
+        """Stop the worker. A graceful close lets in-flight jobs finish first."""
+        if self._process.returncode is None:
+            if graceful:
+                self._process.stdin.close()
+                try:
+                    await asyncio.wait_for(
+                        self._process.wait(), config.READABILITY_TIMEOUT_SEC
+                    )
+                except TimeoutError:
+                    self._process.kill()
+            else:
+                self._process.kill()
+        await self._process.wait()
+        await self._reader
+
+
+class ReadabilityPool:
+    """Pool of persistent readability workers.
+
+    Jobs go to the least loaded worker. The number of jobs in flight is capped,
+    so callers wait for a free slot instead of piling work onto the workers.
+    Workers are replaced after a number of jobs (JSDOM leaks memory over time)
+    and when a job times out. Jobs queued behind the one that timed out, or
+    that made the worker exit, are sent to another worker instead."""
+
+    def __init__(
+        self,
+        size: int = config.READABILITY_WORKERS,
+        max_jobs: int = config.READABILITY_MAX_JOBS,
+        max_pending: int = config.READABILITY_MAX_PENDING,
+        timeout: float = config.READABILITY_TIMEOUT_SEC,
+    ):
+        self._size = size
+        self._max_jobs = max_jobs
+        self._timeout = timeout
+        self._slots = asyncio.Semaphore(size * max_pending)
+        self._workers: list[ReadabilityWorker] = []
+        self._replacing: set[ReadabilityWorker] = set()
+        self._retiring: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        if not await check_node_installed():
+            log.warning("Node.js runtime not found, content extraction disabled.")
+            return
+        await install_npm_packages()
+        for _ in range(self._size):
+            self._workers.append(await self._spawn())
+        log.info(f"Readability pool started with {self._size} workers.")
+
+    async def _spawn(self) -> ReadabilityWorker:
+        worker = ReadabilityWorker()
+        await worker.start()
+        return worker
+
+    async def _replace(self, worker: ReadabilityWorker, graceful: bool) -> None:
+        if worker in self._replacing or worker not in self._workers:
+            return  # Already being replaced after another job.
+        self._replacing.add(worker)
+        try:
+            new_worker = await self._spawn()
+        finally:
+            self._replacing.discard(worker)
+        if worker not in self._workers:
+            # The pool was closed while the new worker was starting.
+            await new_worker.close(graceful=False)
+            return
+        self._workers[self._workers.index(worker)] = new_worker
+
+        task = asyncio.create_task(worker.close(graceful=graceful))
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+
+    async def extract(self, html: str) -> str | None:
+        """Extract the readable text content of an article page."""
+        if not self._workers:
+            return None
+
+        async with self._slots:
+            while True:
+                if not self._workers:
+                    return None
+                worker = min(self._workers, key=lambda worker: worker.load)
+                try:
+                    result = await worker.extract(html, self._timeout)
+                    break
+                except TimeoutError:
+                    log.warning("Readability job timed out, replacing worker.")
+                    await self._replace(worker, graceful=False)
+                    return None
+                except WorkerExitedError as e:
+                    await self._replace(worker, graceful=False)
+                    if not e.started:
+                        continue  # Queued behind the job that stopped it.
+                    log.warning("Readability worker exited, replacing worker.")
+                    return None
+
+            if worker.jobs_done >= self._max_jobs:
+                await self._replace(worker, graceful=True)
+
+        if error := result.get("error"):
+            log.debug(f"Failed to extract article: {error}")
+            return None
+
+        text_content = re.sub(r"\s+", " ", result.get("textContent") or "").strip()
+        if not text_content:
+            log.debug("Content not extracted.")
+            return None
+        return text_content
+
+    async def close(self) -> None:
+        workers, self._workers = self._workers, []
+        await asyncio.gather(
+            *(worker.close() for worker in workers), *list(self._retiring)
+        )
+
+
+async def extract_content_readability(
+    session: ClientSession, readability: ReadabilityPool, url: str
+) -> str | None:
     headers = {"User-Agent": config.USER_AGENT}
 
     try:
@@ -58,19 +266,27 @@ async def extract_content_readability(session: ClientSession, url: str) -> str |
             timeout=config.GET_TIMEOUT,
             headers=headers,
         ) as response:
+            # Read up to the cap instead of buffering the whole page.
+            content = bytearray()
+            async for chunk in response.content.iter_chunked(config.FEED_CHUNK_BYTES):
+                content += chunk
+                if len(content) >= config.READABILITY_MAX_PAGE_BYTES:
+                    break
+            encoding = response.charset or "utf-8"
 
-            entry_html = await response.text()
-
-            with ProcessPoolExecutor() as executor:
-                loop = asyncio.get_event_loop()
-                content = await loop.run_in_executor(
-                    executor, extract_content, entry_html
-                )
-                return content
-            # return await extract_content(entry_html)
+    except (ClientError, TimeoutError) as e:
+        log.error(f"Could not fetch entry html: {url}: {e!r}")
+        return None
 
-    except (ClientResponseError, ClientConnectorError, asyncio.TimeoutError):
-        log.error("Could not fetch entry html: %s", url)
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        encoding = "utf-8"
+    # A wrong charset or a page cut at the cap must not fail the extraction.
+    entry_html = content[: config.READABILITY_MAX_PAGE_BYTES].decode(
+        encoding, errors="replace"
+    )
+    return await readability.extract(entry_html)
 
 
 async def check_node_installed() -> bool:
@@ -112,32 +328,3 @@ async def install_npm_packages() -> None:
                 log.debug("Failed to install npm packages.")
     else:
         log.debug("Node.js runtime not found.")
-
-
-async def extract_content(html: str) -> str | None:
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    js_script_path = os.path.join(current_dir, "readability", "extract_stdout.js")
-
-    try:
-        process: Process = await asyncio.create_subprocess_exec(
-            "node",
-            js_script_path,
-            html,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        stdout, sterr = await process.communicate()
-        if sterr:
-            return None  ## !!!!!
-        if stdout:
-            article_data = json.loads(stdout.decode())
-
-        if article_data:
-            text_content = re.sub(r"\s+", " ", article_data.get("textContent", ""))
-            if not text_content:
-                log.debug("Content not extracted.")
-                return None
-            return text_content
-    except FileNotFoundError:
-        log.debug("Failed to extract article.")
-        return None
@@ -0,0 +1,39 @@
+const readline = require("readline");
+const { Readability } = require("@mozilla/readability");
+const { JSDOM } = require("jsdom");
+
+// Usage: node extract_worker.js
+// Long-lived worker. Reads newline-delimited JSON jobs {"id", "html"} from stdin
+// and writes one {"id", "textContent"} or {"id", "error"} line per job to stdout.
+
+function extractContent(html) {
+  const page = new JSDOM(html);
+  try {
+    const content = new Readability(page.window.document).parse();
+    return content ? content.textContent : null;
+  } finally {
+    page.window.close();
+  }
+}
+
+const input = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+
+input.on("line", (line) => {
+  let job;
+  try {
+    job = JSON.parse(line);
+  } catch (err) {
+    console.error("Error: invalid job.");
+    return;
+  }
+
+  let result;
+  try {
+    result = { id: job.id, textContent: extractContent(job.html) };
+  } catch (err) {
+    result = { id: job.id, error: String(err) };
+  }
+  process.stdout.write(JSON.stringify(result) + "\n");
+});
+
+input.on("close", () => process.exit(0));
@@ -0,0 +1,48 @@
+import random
+import statistics
+from collections.abc import Sequence
+from datetime import UTC, datetime, timedelta
+from itertools import pairwise
+
+from feedbasket import config
+
+
+def _clamp(interval: float) -> int:
+    return int(
+        min(max(interval, config.FETCH_MIN_INTERVAL_SEC), config.FETCH_MAX_INTERVAL_SEC)
+    )
+
+
+def next_fetch_interval(interval: int, published: Sequence[datetime] = ()) -> int:
+    """Adapt a feed's polling interval to its observed publish cadence.
+
+    `published` are the publish dates of the entries new since the last fetch.
+    The target is the median time between them, roughly one new entry per
+    fetch: a single new entry keeps the interval, nothing new (including a 304)
+    lengthens it. The target is averaged with the current interval to avoid
+    oscillating on bursty feeds."""
+    if len(published) > 1:
+        gaps = [(b - a).total_seconds() for a, b in pairwise(sorted(published))]
+        target = statistics.median(gaps)
+    elif published:
+        target = interval
+    else:
+        target = interval * 1.5
+    return _clamp((interval + target) / 2)
+
+
+def backoff_interval(error_count: int, failing_since: datetime | None = None) -> int:
+    """Exponential backoff for feeds that failed to fetch. Feeds failing for
+    longer than FEED_DEMOTE_AFTER_DAYS are demoted to the maximum backoff."""
+    demote_after = timedelta(days=config.FEED_DEMOTE_AFTER_DAYS)
+    if failing_since and datetime.now(UTC) - failing_since > demote_after:
+        return config.FETCH_BACKOFF_MAX_SEC
+    exponent = min(error_count, 16)
+    interval = config.FETCH_INTERVAL_SEC * 2**exponent
+    return int(min(interval, config.FETCH_BACKOFF_MAX_SEC))
+
+
+def next_fetch_at(interval: int) -> datetime:
+    # Jitter spreads feeds added at the same time over the tick window.
+    jitter = random.uniform(0.9, 1.1)  # noqa: S311
+    return datetime.now(UTC) + timedelta(seconds=interval * jitter)
@@ -1,48 +1,212 @@
+"""Feed scraper, embedded in the web app or run as a standalone worker with
+`python -m feedbasket.scraper [--once] [--concurrency N]`."""
+
 from __future__ import annotations
 
+import argparse
 import asyncio
+import hashlib
 import logging
+import signal
 import time
-from collections.abc import AsyncIterator
-from datetime import UTC, datetime
+from collections import defaultdict
+from contextlib import asynccontextmanager, suppress
+from datetime import UTC, datetime, timedelta
+from itertools import chain, zip_longest
+from types import SimpleNamespace
 from typing import TYPE_CHECKING
-
-import feedparser
-from aiohttp import ClientConnectorError, ClientResponseError, ClientSession
-
-from feedbasket import config
-from feedbasket.decorators import RetryLimitError, retry
+from urllib.parse import urlparse
+
+import asyncpg
+from aiohttp import (
+    ClientConnectorError,
+    ClientResponseError,
+    ClientSession,
+    TCPConnector,
+)
+from pydantic import ValidationError
+
+from feedbasket import cache, config, metrics, schedule
+from feedbasket.database import (
+    SCRAPE_CHANNEL,
+    Listener,
+    invalidate_cache,
+    queries,
+    run_migrations,
+)
+from feedbasket.decorators import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryLimitError,
+    retry,
+)
+from feedbasket.feedstream import FeedStream
 from feedbasket.models import Feed, NewFeedEntry
+from feedbasket.parser import ENTRY_FIELDS, EntryRow, ParseEngine, ParseError
+from feedbasket.seen import SeenFilter
 
 if TYPE_CHECKING:
-    from aiosql.queries import Queries
-    from asyncpg import Connection, Pool
-
+    from collections.abc import Iterable
 
-# from feedbasket.readability import extract_content_readability
+    from aiohttp.web import AppRunner
+    from aiosql.queries import Queries
+    from asyncpg import Connection, Pool, Record
 
 
 log = logging.getLogger(__name__)
 
+# Shared by all scrapers in the process: a host is down for all of them.
+host_circuit = CircuitBreaker(
+    config.CIRCUIT_FAILURE_THRESHOLD,
+    config.CIRCUIT_COOLDOWN_SEC,
+    config.CIRCUIT_MAX_COOLDOWN_SEC,
+)
+
+
+class HostScheduler:
+    """Per-host politeness: limits concurrent requests to a single host and
+    spaces consecutive requests to it by a minimum delay."""
+
+    def __init__(self, max_per_host: int, min_delay: float):
+        self._max_per_host = max_per_host
+        self._min_delay = min_delay
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._last_request: dict[str, float] = {}
+
+    @staticmethod
+    def host(url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+    def interleave(self, feeds: list[Feed]) -> list[Feed]:
+        """Group feeds by host and order them round-robin across hosts, so that
+        a host with many feeds does not queue up ahead of everything else."""
+        by_host: dict[str, list[Feed]] = defaultdict(list)
+        for feed in feeds:
+            by_host[self.host(feed.feed_url)].append(feed)
+        rounds = zip_longest(*by_host.values())
+        return [feed for feed in chain.from_iterable(rounds) if feed is not None]
+
+    @asynccontextmanager
+    async def slot(self, url: str, limiter: asyncio.Semaphore | None = None):
+        """Hold a slot for the host of `url`, then one of `limiter`, if given.
+        The delay is waited out before taking a slot of `limiter`, so that other
+        hosts can use it meanwhile, and the request time is recorded once it is
+        taken, so that the request is actually sent at the spaced time."""
+        host = self.host(url)
+        semaphore = self._semaphores.setdefault(
+            host, asyncio.Semaphore(self._max_per_host)
+        )
+        lock = self._locks.setdefault(host, asyncio.Lock())
+
+        async with semaphore:
+            async with lock:
+                last_request = self._last_request.get(host)
+                if last_request is not None:
+                    delay = last_request + self._min_delay - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                if limiter:
+                    await limiter.acquire()
+                self._last_request[host] = time.monotonic()
+            try:
+                yield
+            finally:
+                if limiter:
+                    limiter.release()
+
 
 class FeedScraper:
     def __init__(self, pool: Pool, queries: Queries):
         self._pool = pool
         self._queries = queries
+        self._hosts = HostScheduler(config.HOST_CONCURRENCY, config.HOST_MIN_DELAY_SEC)
+        self._parser = ParseEngine()
+        self._seen = self._build_seen([])
+        self._seen_loaded = False
+        self._seen_lock = asyncio.Lock()
         log.info("Feed scraper initialized.")
 
+    def close(self) -> None:
+        self._parser.close()
+
+    @staticmethod
+    def _seen_key(feed_id: int, entry_url: str) -> str:
+        # Keyed by feed: a feed subscribed to again gets a new id, so entries
+        # deleted on unsubscribe are not mistaken for stored ones.
+        return f"{feed_id} {entry_url}"
+
+    def _build_seen(self, rows: Iterable[Record]) -> SeenFilter:
+        seen = SeenFilter(config.SEEN_FILTER_CAPACITY, config.SEEN_FILTER_ERROR_RATE)
+        for row in rows:
+            seen.add(self._seen_key(row["feed_id"], row["entry_url"]))
+        return seen
+
+    async def _load_seen(self, conn: Connection) -> None:
+        """Warm up the seen filter with the most recently inserted entries."""
+        urls = await self._queries.get_recent_entry_urls(
+            conn, limit=config.SEEN_FILTER_CAPACITY
+        )
+        # Hashing that many keys takes seconds, which must not stall the event
+        # loop when the scraper runs in the web process. Scraping waits for the
+        # load, so there are no keys added meanwhile to carry over.
+        self._seen = await asyncio.to_thread(self._build_seen, reversed(urls))
+        self._seen_loaded = True
+        log.info(f"Seen filter loaded with {len(urls)} entry URLs.")
+
+    def _build_entries(self, rows: list[EntryRow], feed_id: int) -> list[NewFeedEntry]:
+        entries = []
+        for row in rows:
+            fields = dict(zip(ENTRY_FIELDS, row, strict=True))
+            url = fields["entry_url"]
+            if url and self._seen_key(feed_id, url) in self._seen:
+                log.debug("Skipping entry: already stored.")
+                continue
+            fields["published_date"] = datetime.fromtimestamp(
+                fields["published_date"], UTC
+            )
+            if fields["updated_date"] is not None:
+                fields["updated_date"] = datetime.fromtimestamp(
+                    fields["updated_date"], UTC
+                )
+            try:
+                # Filled in later by the content extractor, see extractor.py.
+                entries.append(NewFeedEntry(**fields, cleaned_content=None))
+            except ValidationError:
+                log.debug(f"Skipping entry: invalid. {fields['entry_url']}")
+        return entries
+
     async def _update_feed(
         self, entries: list[NewFeedEntry], feed_url: str, feed_id: int
-    ) -> None:
+    ) -> int:
+        """Insert all entries of a feed in a single statement.
+        Returns the number of entries actually inserted."""
         log.info(f"Updating feed: {feed_url}")
+        rows = [entry.model_dump() for entry in entries]
+        columns = {field: [row[field] for row in rows] for field in rows[0]}
+
+        start = time.perf_counter()
         async with self._pool.acquire() as conn:
-            for entry in entries:
-                await self._queries.insert_entry(
-                    conn,
-                    feed_id=feed_id,
-                    **entry.model_dump(),
-                )
-        log.debug(f"Updated feed: {feed_url}")
+            inserted = await self._queries.insert_entries(
+                conn,
+                feed_id=feed_id,
+                extract_content=config.EXTRACT_CONTENT,
+                **columns,
+            )
+        elapsed = time.perf_counter() - start
+        metrics.observe_phase("db_write", elapsed, feed_id)
+        metrics.ENTRIES_INSERTED.inc(inserted)
+
+        for row in rows:
+            self._seen.add(self._seen_key(feed_id, row["entry_url"]))
+        if inserted:
+            cache.invalidate("entries")
+
+        log.debug(
+            f"Updated feed: {feed_url}, {inserted} of {len(rows)} entries new, "
+            f"write time: {elapsed:.3f}s"
+        )
+        return inserted
 
     async def _update_feed_metadata(
         self,
@@ -50,6 +214,9 @@ class FeedScraper:
         etag_header: str,
         last_modified_header: str,
         last_updated: datetime | None,
+        fetch_interval_sec: int,
+        content_hash: str,
+        entry_fingerprints: list[int],
     ) -> None:
         log.debug(f"Updating feed metadata: {feed_url}")
         async with self._pool.acquire() as conn:
@@ -60,78 +227,53 @@ class FeedScraper:
                 last_modified_header=last_modified_header,
                 last_updated=last_updated,
                 parsing_error_count=0,  # reset parsing error count
+                fetch_interval_sec=fetch_interval_sec,
+                next_fetch_at=schedule.next_fetch_at(fetch_interval_sec),
+                content_hash=content_hash,
+                entry_fingerprints=entry_fingerprints,
             )
 
-    async def _update_feed_error_count(self, feed_id: int) -> None:
+    async def _update_feed_schedule(
+        self,
+        feed_id: int,
+        fetch_interval_sec: int,
+        next_fetch_at: datetime | None = None,
+    ) -> None:
         async with self._pool.acquire() as conn:
-            await self._queries.update_feed_error_count(conn, feed_id=feed_id)
-
-    def _parse_feed(
-        self, feed_xml: str, last_updated: datetime | None
-    ) -> list[NewFeedEntry]:
-        feed_data = feedparser.parse(feed_xml)
-        current_datetime_utc = datetime.now(UTC)
-
-        # Some feeds have incorrect published date that does not match the lastest entry date.
-        # Can't use it to skip parsing the entries if server also ignores the etag and last-modified headers.
-
-        # if feed_published := feed_data.feed.get("updated_parsed"):
-        #     feed_published_datetime = datetime.fromtimestamp(
-        #         time.mktime(feed_published)
-        #     )
-        #     if last_updated and feed_published_datetime < last_updated:
-        #         log.debug(f"Skipping feed: no new entries. {feed_data.feed.link}")
-        #         return
-
-        #     if (
-        #         current_datetime_utc - feed_published_datetime
-        #     ).days > config.SKIP_OLDER_THAN_DAYS:
-        #         log.debug(f"Skipping feed: too old., {feed_data.feed.link}")
-        #         return
-
-        entries = []
-        for entry in feed_data.entries:
-            try:
-                published = entry.get("published_parsed", entry.get("updated_parsed"))
-                published_datetime = datetime.fromtimestamp(time.mktime(published), UTC)
-            except (ValueError, TypeError):
-                log.debug("Skipping entry: invalid/no publication date.")
-                continue
-
-            age_in_days = (current_datetime_utc - published_datetime).days
-            if age_in_days > config.SKIP_OLDER_THAN_DAYS:
-                log.debug(
-                    f"Skipping entry: older than {config.SKIP_OLDER_THAN_DAYS} days."
-                )
-                continue
-
-            # Skip if last_updated is not None and published before last fetch: for feeds that ignore etag/last_modified
-            if last_updated and published_datetime < last_updated:
-                log.debug("Skipping entry: duplicate.")
-                continue
+            await self._queries.update_feed_schedule(
+                conn,
+                feed_id=feed_id,
+                fetch_interval_sec=fetch_interval_sec,
+                next_fetch_at=next_fetch_at
+                or schedule.next_fetch_at(fetch_interval_sec),
+            )
 
-            # cleaned_content = await extract_content_readability(entry.get("link"))
-            cleaned_content = None
-
-            entries.append(
-                NewFeedEntry(
-                    entry_title=entry.get("title"),
-                    entry_url=entry.get("link"),
-                    author=entry.get("author"),
-                    published_date=published_datetime,
-                    updated_date=entry.get("updated_parsed"),
-                    cleaned_content=cleaned_content,
-                    summary=entry.get("summary"),
-                    content=(
-                        entry.get("content")[0].get("value")
-                        if entry.get("content")
-                        else None
-                    ),
-                ),
+    async def _update_feed_error_count(
+        self, feed: Feed, error: str, retry_after: float | None = None
+    ) -> None:
+        # Back off from failing feeds, but keep the last healthy interval around.
+        # Never retry before the host asked us to.
+        backoff = schedule.backoff_interval(
+            feed.parsing_error_count + 1, feed.failing_since
+        )
+        backoff = max(backoff, int(retry_after or 0))
+        async with self._pool.acquire() as conn:
+            await self._queries.update_feed_error_count(
+                conn,
+                feed_id=feed.feed_id,
+                last_error=error[:500],
+                fetch_interval_sec=feed.fetch_interval_sec,
+                next_fetch_at=schedule.next_fetch_at(backoff),
             )
-        return entries
 
-    @retry(ClientResponseError, ClientConnectorError, asyncio.TimeoutError)
+    @retry(
+        ClientResponseError,
+        ClientConnectorError,
+        asyncio.TimeoutError,
+        max_wait=config.RETRY_MAX_WAIT_SEC,
+        circuit=host_circuit,
+        key=lambda self, session, feed: HostScheduler.host(feed.feed_url),
+    )
     async def _fetch_feed(self, session: ClientSession, feed: Feed) -> tuple | None:
         log.info(f"Attempting to fetch: {feed.feed_url}")
 
@@ -147,6 +289,7 @@ class FeedScraper:
             raise_for_status=True,
             timeout=config.GET_TIMEOUT,
             headers=headers,
+            trace_request_ctx={"feed_id": feed.feed_id},
         ) as response:
             if response.status == 304:
                 log.info(f"No updates to: {feed.feed_url}")
@@ -154,32 +297,86 @@ class FeedScraper:
 
             etag_header = response.headers.get("ETag")
             last_modified_header = response.headers.get("Last-Modified")
-            feed_xml = await response.text()
+            content_type = response.headers.get("Content-Type")
 
-            return feed_xml, etag_header, last_modified_header
+            # Entries older than this are skipped by _parse_feed anyway.
+            cutoff = datetime.now(UTC) - timedelta(days=config.SKIP_OLDER_THAN_DAYS)
+            if feed.last_updated:
+                cutoff = max(cutoff, feed.last_updated)
 
-    async def _scrape_feed(self, session: ClientSession, feed: Feed) -> None:
+            stream = FeedStream(
+                cutoff, config.FEED_MAX_BYTES, config.FEED_EARLY_STOP_ENTRIES
+            )
+            start = time.perf_counter()
+            async for chunk in response.content.iter_chunked(config.FEED_CHUNK_BYTES):
+                if not stream.feed(chunk):
+                    break
+            metrics.observe_phase("download", time.perf_counter() - start, feed.feed_id)
+            metrics.FETCH_BYTES.inc(stream.bytes_read)
+            if stream.stopped_early:
+                log.debug(f"Stopped reading at old entries: {feed.feed_url}")
+            feed_xml = stream.body()
+
+            return feed_xml, content_type, etag_header, last_modified_header
+
+    async def _scrape_feed(self, session: ClientSession, feed: Feed) -> int:
+        """Fetch, parse and store a feed. Returns the number of new entries."""
         try:
             feed_data = await self._fetch_feed(session, feed)
             if not feed_data:
-                return
-            feed_xml, etag_header, last_modified_header = feed_data
-        except RetryLimitError:
+                interval = schedule.next_fetch_interval(feed.fetch_interval_sec)
+                await self._update_feed_schedule(feed.feed_id, interval)
+                return 0
+            feed_xml, content_type, etag_header, last_modified_header = feed_data
+        except RetryLimitError as e:
             log.error(f"Could not fetch feed: {feed.feed_url}")
-            await self._update_feed_error_count(feed.feed_id)
-            return
-
-        log.debug(f"Parsing feed: {feed.feed_url}")
-
-        loop = asyncio.get_running_loop()
-        entries = await loop.run_in_executor(
-            None, self._parse_feed, feed_xml, feed.last_updated
-        )
-
+            cause = e.__cause__ or e
+            error = str(cause) or type(cause).__name__
+            await self._update_feed_error_count(feed, error, e.retry_after)
+            return 0
+        except CircuitOpenError as e:
+            # Not fetched, so not an error of the feed: just retry once the
+            # circuit of its host closes.
+            log.info(f"Skipping feed: host unreachable. {feed.feed_url}")
+            await self._update_feed_schedule(
+                feed.feed_id,
+                feed.fetch_interval_sec,
+                datetime.now(UTC) + timedelta(seconds=e.retry_in),
+            )
+            return 0
+
+        # Many feeds ignore etag/last-modified: skip parsing if the body is unchanged.
+        content_hash = hashlib.blake2b(feed_xml, digest_size=16).hexdigest()
+        if content_hash == feed.content_hash:
+            log.debug(f"Skipping feed: body unchanged. {feed.feed_url}")
+            rows, fingerprints = [], feed.entry_fingerprints or []
+        else:
+            log.debug(f"Parsing feed: {feed.feed_url}")
+            start = time.perf_counter()
+            try:
+                rows, fingerprints = await self._parser.parse(
+                    feed_xml,
+                    content_type,
+                    feed.last_updated,
+                    frozenset(feed.entry_fingerprints or ()),
+                )
+            except ParseError as e:
+                # Retried later, with the hash and headers of the previous fetch.
+                log.error(f"Could not parse feed: {feed.feed_url}")
+                await self._update_feed_error_count(feed, str(e))
+                return 0
+            metrics.observe_phase("parse", time.perf_counter() - start, feed.feed_id)
+            metrics.ENTRIES_PARSED.inc(len(rows))
+        entries = self._build_entries(rows, feed.feed_id)
+
+        inserted = 0
         last_updated = feed.last_updated
+        published = []
         if entries:
-            await self._update_feed(entries, feed.feed_url, feed.feed_id)
+            inserted = await self._update_feed(entries, feed.feed_url, feed.feed_id)
             last_updated = datetime.now(UTC)
+            if inserted:
+                published = [entry.published_date for entry in entries]
 
         # Update etag/last-modified to prevent parsing the feed again. Last_updated unchanged if no entries.
         await self._update_feed_metadata(
@@ -187,27 +384,207 @@ class FeedScraper:
             etag_header,
             last_modified_header,
             last_updated,
+            schedule.next_fetch_interval(feed.fetch_interval_sec, published),
+            content_hash,
+            fingerprints,
         )
+        return inserted
 
-    async def _get_all_feeds(self, conn: Connection) -> AsyncIterator[Feed]:
-        # Append _cursor to query name to access cursor object.
-        async with self._queries.get_all_feeds_cursor(conn) as cursor:
-            async for feed in cursor:
-                yield Feed(**feed)
+    async def _claim_due_feeds(self) -> list[Feed]:
+        async with self._pool.acquire() as conn:
+            rows = await self._queries.claim_due_feeds(
+                conn,
+                lease_sec=config.SCRAPE_LEASE_SEC,
+                batch_size=config.SCRAPE_CLAIM_BATCH_SIZE,
+            )
+        return [Feed(**row) for row in rows]
+
+    async def _scrape_feed_bounded(
+        self, semaphore: asyncio.Semaphore, session: ClientSession, feed: Feed
+    ) -> int:
+        if host_circuit.retry_in(self._hosts.host(feed.feed_url)):
+            # Fails fast without a request, no need to wait for the host slot.
+            return await self._scrape_feed(session, feed)
+        # Wait for the host slot first so feeds queued behind a busy host
+        # do not hold on to global slots.
+        async with self._hosts.slot(feed.feed_url, semaphore):
+            return await self._scrape_feed(session, feed)
+
+    async def _scrape_feeds(
+        self, semaphore: asyncio.Semaphore, session: ClientSession, feeds: list[Feed]
+    ) -> int:
+        """Scrape feeds concurrently. Returns the number of new entries."""
+        feeds = self._hosts.interleave(feeds)
+        results = await asyncio.gather(
+            *(self._scrape_feed_bounded(semaphore, session, feed) for feed in feeds),
+            return_exceptions=True,
+        )
 
-    async def run(self, url: str | None = None) -> None:
+        new_entries = 0
+        for feed, result in zip(feeds, results, strict=True):
+            # Including CancelledError, e.g. of a parse in a restarted pool.
+            if isinstance(result, BaseException):
+                log.error(f"Failed to scrape feed: {feed.feed_url}: {result!r}")
+            else:
+                new_entries += result
+        return new_entries
+
+    async def run(
+        self, url: str | None = None, stop: asyncio.Event | None = None
+    ) -> None:
+        """Scrape the feed at `url`, or all due feeds. Once `stop` is set no more
+        feeds are claimed, the ones already claimed are finished."""
         start = time.perf_counter()
-        count = 0
 
         async with self._pool.acquire() as conn:
-            async with ClientSession() as session:
-                if url:
-                    feed = Feed(**await self._queries.get_feed_by_url(conn, url))
-                    count = 1
-                    await self._scrape_feed(session, feed)
-                else:
-                    async for feed in self._get_all_feeds(conn):
-                        count += 1
-                        await self._scrape_feed(session, feed)
-
-        log.info(f"Scraping time: {time.perf_counter() - start}, Feed count: {count}")
+            # Scrape runs may overlap, such as a single feed added meanwhile.
+            async with self._seen_lock:
+                if not self._seen_loaded:
+                    await self._load_seen(conn)
+            if url:
+                feed = Feed(**await self._queries.get_feed_by_url(conn, url))
+            else:
+                rows = await self._queries.get_feed_ids(conn)
+                metrics.prune_feeds({row["feed_id"] for row in rows})
+
+        # Fan the fetches out over the shared session, capped by a global limit.
+        # The connector keeps connections alive per host between requests.
+        semaphore = asyncio.Semaphore(config.SCRAPER_CONCURRENCY)
+        connector = TCPConnector(
+            limit=config.SCRAPER_CONCURRENCY,
+            limit_per_host=config.HOST_CONCURRENCY,
+            keepalive_timeout=config.HOST_KEEPALIVE_SEC,
+            ttl_dns_cache=config.DNS_CACHE_TTL_SEC,
+        )
+        count = new_entries = 0
+        async with ClientSession(
+            connector=connector, trace_configs=[metrics.trace_config()]
+        ) as session:
+            if url:
+                count = 1
+                new_entries = await self._scrape_feeds(semaphore, session, [feed])
+            else:
+                # Due feeds are claimed in batches, so that scrapers running in
+                # other processes or on other nodes share them without overlap.
+                while not (stop and stop.is_set()):
+                    if not (feeds := await self._claim_due_feeds()):
+                        break
+                    count += len(feeds)
+                    new_entries += await self._scrape_feeds(semaphore, session, feeds)
+
+        if new_entries:
+            # Lets web processes drop their cached pages, see main.py.
+            await invalidate_cache(self._pool, "entries")
+
+        elapsed = time.perf_counter() - start
+        log.info(
+            f"Scraping time: {elapsed:.2f}s, Feed count: {count}, "
+            f"Throughput: {count / elapsed:.2f} feeds/sec, New entries: {new_entries}"
+        )
+        log.info(f"Seen filter: {self._seen.stats()}")
+        metrics.SCRAPE_CYCLE_SECONDS.observe(elapsed)
+        metrics.SEEN_FILTER_CHECKS.set(self._seen.checks)
+        metrics.SEEN_FILTER_HITS.set(self._seen.hits)
+
+
+async def run_forever(
+    scraper: FeedScraper, wakeup: asyncio.Event, stop: asyncio.Event | None = None
+) -> None:
+    """Scrape due feeds every tick, or as soon as `wakeup` is set, until `stop`
+    is set. A failed run, e.g. while Postgres restarts, is retried next tick."""
+    while not (stop and stop.is_set()):
+        try:
+            await scraper.run(stop=stop)
+        except Exception:
+            log.exception("Scrape run failed.")
+        with suppress(TimeoutError):
+            await asyncio.wait_for(wakeup.wait(), config.SCHEDULER_TICK_SEC)
+        wakeup.clear()
+
+
+async def main(args: argparse.Namespace) -> None:
+    config.SCRAPER_CONCURRENCY = args.concurrency
+    pool = await asyncpg.create_pool(
+        config.PG_URI, min_size=args.pool_min, max_size=args.pool_max
+    )
+    scraper = FeedScraper(pool, queries)
+    stop, wakeup = asyncio.Event(), asyncio.Event()
+    task = asyncio.current_task()
+
+    def shutdown() -> None:
+        # First signal finishes the feeds in flight, a second one cancels them.
+        if stop.is_set():
+            task.cancel()
+            return
+        log.info("Shutting down after the feeds in flight.")
+        stop.set()
+        wakeup.set()
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, shutdown)
+
+    metrics_server = None
+    try:
+        if args.metrics_port:
+            metrics_server = await serve_metrics(args.metrics_port)
+        app = SimpleNamespace(state=SimpleNamespace(pool=pool))
+        await run_migrations(app, queries)
+        if args.once:
+            await scraper.run(stop=stop)
+        else:
+            listener = Listener(
+                pool, {SCRAPE_CHANNEL: lambda _: wakeup.set()}, on_reconnect=wakeup.set
+            )
+            await listener.start()
+            try:
+                await run_forever(scraper, wakeup, stop)
+            finally:
+                await listener.close()
+    finally:
+        if metrics_server:
+            await metrics_server.cleanup()
+        scraper.close()
+        await pool.close()
+
+
+async def serve_metrics(port: int) -> AppRunner:
+    """Serve /metrics on `port`, the worker has no web app to expose them."""
+    # Imported here, the web app never needs it.
+    from aiohttp import web
+
+    async def get_metrics(request: web.Request) -> web.Response:
+        return web.Response(
+            body=metrics.render_metrics().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", get_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, port=port).start()
+    log.info(f"Serving metrics on port {port}.")
+    return runner
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape due feeds.")
+    parser.add_argument(
+        "--once", action="store_true", help="Scrape due feeds once and exit."
+    )
+    parser.add_argument("--concurrency", type=int, default=config.SCRAPER_CONCURRENCY)
+    parser.add_argument("--pool-min", type=int, default=config.SCRAPER_PG_POOL_MIN)
+    parser.add_argument("--pool-max", type=int, default=config.SCRAPER_PG_POOL_MAX)
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=config.SCRAPER_METRICS_PORT,
+        help="Port to serve /metrics on, 0 to disable.",
+    )
+    logging.basicConfig(
+        level=config.LOG_LEVEL,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    with suppress(asyncio.CancelledError):
+        asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,62 @@
+import hashlib
+import math
+
+
+class SeenFilter:
+    """Compact in-memory set of recently inserted entry URLs (a Bloom filter).
+
+    Lets the scraper drop entries it already stored before validating them and
+    sending them to Postgres. There are no false negatives; a false positive
+    drops a new entry, so error_rate should be kept very low. The filter holds
+    two generations of `capacity` URLs each: once the current one is full it
+    replaces the previous one, so old URLs age out and memory stays bounded."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self._capacity = capacity
+        self._size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self._hash_count = max(1, round(self._size / capacity * math.log(2)))
+        self._current = bytearray(self._size // 8 + 1)
+        self._previous = bytearray(self._size // 8 + 1)
+        self._count = 0
+        self.checks = 0
+        self.hits = 0
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._current) + len(self._previous)
+
+    def _positions(self, url: str) -> list[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest.
+        digest = hashlib.blake2b(url.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self._size for i in range(self._hash_count)]
+
+    @staticmethod
+    def _test(bits: bytearray, positions: list[int]) -> bool:
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in positions)
+
+    def add(self, url: str) -> None:
+        if self._count >= self._capacity:
+            self._previous = self._current
+            self._current = bytearray(len(self._previous))
+            self._count = 0
+        for pos in self._positions(url):
+            self._current[pos >> 3] |= 1 << (pos & 7)
+        self._count += 1
+
+    def __contains__(self, url: str) -> bool:
+        positions = self._positions(url)
+        found = self._test(self._current, positions) or self._test(
+            self._previous, positions
+        )
+        self.checks += 1
+        self.hits += found
+        return found
+
+    def stats(self) -> str:
+        hit_rate = self.hits / self.checks if self.checks else 0
+        return (
+            f"{self.hits} of {self.checks} checks hit ({hit_rate:.1%}), "
+            f"{self.memory_bytes // 1024} KiB"
+        )
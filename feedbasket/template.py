@@ -1,12 +1,15 @@
 from datetime import UTC, datetime
+from functools import lru_cache
 from pathlib import Path
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urlsplit
 
-import tldextract
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, select_autoescape
 from litestar.contrib.jinja import JinjaTemplateEngine
 from litestar.template.config import TemplateConfig
-from tzlocal import get_localzone
+from markupsafe import Markup
+
+from feedbasket import cache
+from feedbasket.models import EntryItem
 
 
 def display_pub_date(entry_date: datetime | None) -> str:
@@ -36,25 +39,73 @@ def display_pub_date(entry_date: datetime | None) -> str:
 #    return parsed_url.netloc.replace("www.", "")
 
 
+@lru_cache(maxsize=1)
+def _domain_extractor():
+    # Loaded on first use. Uses the public suffix list snapshot bundled with
+    # tldextract, never fetches it, so rendering does not wait on the network.
+    import tldextract
+
+    return tldextract.TLDExtract(suffix_list_urls=())
+
+
+@lru_cache(maxsize=4096)
+def _registered_domain(netloc: str) -> str:
+    extracted = _domain_extractor()(netloc)
+    return extracted.domain + "." + extracted.suffix
+
+
 def display_feed_url(url: str) -> str:
     """Shorten feed source URL."""
-    extracted = tldextract.extract(url)
-    return extracted.domain + "." + extracted.suffix
+    # Public suffix lookups are cached per host, entries of a feed share one.
+    return _registered_domain(urlsplit(url).netloc or url)
 
 
+@lru_cache(maxsize=4096)
 def display_main_url(feed_url: str) -> str:
     """Get main website URL from feed URL."""
     parsed_url = urlparse(feed_url)
     return f"{parsed_url.scheme}://{parsed_url.netloc}"
 
 
+@lru_cache(maxsize=1)
+def _local_zone():
+    from tzlocal import get_localzone
+
+    return get_localzone()
+
+
 def convert_utc_to_local(utc_datetime: datetime) -> datetime:
-    local_tz = get_localzone()
+    local_tz = _local_zone()
     _utc_datetime = utc_datetime.replace(tzinfo=UTC)
     return _utc_datetime.astimezone(local_tz)
 
 
-jinja_env = Environment(loader=FileSystemLoader(Path(__file__).parent / "templates"))
+def render_entry(entry: EntryItem) -> Markup:
+    """Render an entry of a timeline. The fragment is reused for as long as the
+    entry's favourite state and displayed date stay the same."""
+    key = (
+        "entry",
+        entry.entry_id,
+        entry.is_favourite,
+        display_pub_date(entry.published_date),
+    )
+    fragment = cache.fragments.get(key)
+    if fragment is None:
+        fragment = jinja_env.get_template("entry_item.html").render(entry=entry)
+        cache.fragments.set(key, fragment, len(fragment))
+    # Rendered with autoescape, safe to include as is.
+    return Markup(fragment)  # noqa: S704
+
+
+def render_template(template_name: str, context: dict) -> str:
+    return jinja_env.get_template(template_name).render(context)
+
+
+jinja_env = Environment(
+    loader=FileSystemLoader(Path(__file__).parent / "templates"),
+    autoescape=select_autoescape(),
+)
+jinja_env.globals["render_entry"] = render_entry
 jinja_env.filters.update(
     {
         "display_pub_date": display_pub_date,
@@ -0,0 +1,38 @@
+"""Tests that need Postgres run against FEEDBASKET_TEST_PG_URI, in a schema of
+their own that is dropped afterwards, and are skipped if it is not set."""
+
+import os
+from types import SimpleNamespace
+
+import asyncpg
+import pytest
+
+from feedbasket.database import queries, run_migrations
+
+TEST_PG_URI = os.environ.get("FEEDBASKET_TEST_PG_URI")
+
+
+@pytest.fixture(scope="module")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="module")
+async def pg_pool(anyio_backend):
+    """A pool on a fresh schema with all migrations applied."""
+    if not TEST_PG_URI:
+        pytest.skip("FEEDBASKET_TEST_PG_URI is not set.")
+
+    schema = f"feedbasket_test_{os.getpid()}"
+    conn = await asyncpg.connect(TEST_PG_URI)
+    await conn.execute(f"CREATE SCHEMA {schema}")
+    pool = await asyncpg.create_pool(
+        TEST_PG_URI, min_size=1, max_size=2, server_settings={"search_path": schema}
+    )
+    try:
+        await run_migrations(SimpleNamespace(state=SimpleNamespace(pool=pool)), queries)
+        yield pool
+    finally:
+        await pool.close()
+        await conn.execute(f"DROP SCHEMA {schema} CASCADE")
+        await conn.close()
@@ -0,0 +1,186 @@
+"""Circuit breaker states, Retry-After parsing and the retry decorator."""
+
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+
+import pytest
+
+from feedbasket import config, decorators
+from feedbasket.decorators import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryLimitError,
+    _retry_after,
+    retry,
+)
+
+THRESHOLD = 3
+COOLDOWN = 10
+MAX_COOLDOWN = 60
+
+
+class ResponseError(Exception):
+    """Quacks like aiohttp.ClientResponseError."""
+
+    def __init__(self, status: int, retry_after: str | None = None):
+        self.status = status
+        self.headers = {"Retry-After": retry_after} if retry_after else {}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(decorators.time, "monotonic", lambda: clock[0])
+    return clock
+
+
+@pytest.fixture
+def circuit(clock):
+    return CircuitBreaker(THRESHOLD, COOLDOWN, MAX_COOLDOWN)
+
+
+def fail(circuit: CircuitBreaker, times: int) -> None:
+    for _ in range(times):
+        circuit.failure("host")
+
+
+def test_opens_at_threshold(circuit):
+    fail(circuit, THRESHOLD - 1)
+    circuit.check("host")
+
+    fail(circuit, 1)
+    with pytest.raises(CircuitOpenError) as excinfo:
+        circuit.check("host")
+    assert excinfo.value.retry_in == COOLDOWN
+    circuit.check("other host")
+
+
+def test_cooldown_doubles_up_to_max(circuit):
+    fail(circuit, THRESHOLD)
+    assert circuit.retry_in("host") == COOLDOWN
+    fail(circuit, 1)
+    assert circuit.retry_in("host") == COOLDOWN * 2
+    fail(circuit, 1)
+    assert circuit.retry_in("host") == COOLDOWN * 4
+    fail(circuit, 100)
+    assert circuit.retry_in("host") == MAX_COOLDOWN
+
+
+def test_half_open_success_closes(circuit, clock):
+    fail(circuit, THRESHOLD)
+    clock[0] += COOLDOWN
+    # Calls go through again once the cool-down is over.
+    circuit.check("host")
+    circuit.success("host")
+    fail(circuit, THRESHOLD - 1)
+    circuit.check("host")
+
+
+def test_half_open_failure_reopens(circuit, clock):
+    fail(circuit, THRESHOLD)
+    clock[0] += COOLDOWN
+    circuit.check("host")
+    fail(circuit, 1)
+    assert circuit.retry_in("host") == COOLDOWN * 2
+
+
+def test_trip_is_capped(circuit):
+    circuit.trip("host", 10 * MAX_COOLDOWN)
+    assert circuit.retry_in("host") == MAX_COOLDOWN
+
+
+@pytest.mark.parametrize(
+    ("error", "expected"),
+    [
+        (ResponseError(429, "120"), 120),
+        (ResponseError(503, "1.5"), 1.5),
+        (ResponseError(429, "-5"), 0),
+        (ResponseError(429, "soon"), None),
+        (ResponseError(429), None),
+        (ResponseError(500, "120"), None),
+        (ValueError(), None),
+        (ResponseError(429, "inf"), None),
+        (ResponseError(429, "nan"), None),
+        (ResponseError(429, "1e308"), config.FETCH_BACKOFF_MAX_SEC),
+    ],
+)
+def test_retry_after(error, expected):
+    assert _retry_after(error) == expected
+
+
+def test_retry_after_http_date():
+    date = datetime.now(UTC) + timedelta(minutes=10)
+    assert 590 < _retry_after(ResponseError(429, format_datetime(date))) <= 600
+    date = datetime.now(UTC) - timedelta(minutes=10)
+    assert _retry_after(ResponseError(429, format_datetime(date))) == 0
+
+
+class Flaky:
+    """Raises the given errors in turn, then succeeds."""
+
+    __name__ = "flaky"
+
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self, url: str) -> str:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.mark.anyio
+async def test_retry_until_success():
+    func = Flaky(ResponseError(500), ResponseError(500))
+    assert await retry(ResponseError, retries=3, wait=0)(func)("url") == "ok"
+    assert func.calls == 3
+
+
+@pytest.mark.anyio
+async def test_retry_limit():
+    func = Flaky(*(ResponseError(500) for _ in range(3)))
+    with pytest.raises(RetryLimitError):
+        await retry(ResponseError, retries=3, wait=0)(func)("url")
+    assert func.calls == 3
+
+
+@pytest.mark.anyio
+async def test_long_retry_after_stops_retrying_and_trips(circuit):
+    func = Flaky(ResponseError(429, "3600"))
+    decorator = retry(
+        ResponseError, retries=3, wait=0, max_wait=30, circuit=circuit, key=str
+    )
+    wrapped = decorator(func)
+    with pytest.raises(RetryLimitError) as excinfo:
+        await wrapped("url")
+    assert excinfo.value.retry_after == 3600
+    assert func.calls == 1
+    assert circuit.retry_in("url") == MAX_COOLDOWN
+
+
+@pytest.mark.anyio
+async def test_circuit_fails_fast(circuit):
+    func = Flaky(*(ResponseError(500) for _ in range(THRESHOLD)))
+    decorator = retry(
+        ResponseError, retries=THRESHOLD, wait=0, circuit=circuit, key=str
+    )
+    wrapped = decorator(func)
+    with pytest.raises(RetryLimitError):
+        await wrapped("url")
+    with pytest.raises(CircuitOpenError):
+        await wrapped("url")
+    assert func.calls == THRESHOLD
+
+
+@pytest.mark.anyio
+async def test_client_errors_do_not_trip(circuit):
+    func = Flaky(*(ResponseError(404) for _ in range(THRESHOLD)))
+    decorator = retry(
+        ResponseError, retries=THRESHOLD, wait=0, circuit=circuit, key=str
+    )
+    wrapped = decorator(func)
+    with pytest.raises(RetryLimitError):
+        await wrapped("url")
+    assert circuit.retry_in("url") == 0
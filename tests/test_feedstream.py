@@ -0,0 +1,120 @@
+"""FeedStream must cut a feed after the last item that can still be new, and
+the cut body must still be a well-formed feed."""
+
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+
+import feedparser
+import pytest
+
+from feedbasket.feedstream import FeedStream
+
+NOW = datetime(2026, 1, 1, tzinfo=UTC)
+CUTOFF = NOW - timedelta(days=60)
+ITEMS = 20
+EARLY_STOP_AFTER = 5
+
+
+# Newest first, 10 days apart.
+AGES = range(ITEMS)
+
+
+def rss(ages=AGES) -> bytes:
+    # With markup in CDATA that looks like an end tag.
+    body = "".join(
+        f"""
+        <item>
+            <title>Item {i}</title>
+            <link>https://example.com/{i}</link>
+            <description><![CDATA[<p>Not the end</item></p>]]></description>
+            <pubDate>{format_datetime(NOW - timedelta(days=10 * i))}</pubDate>
+        </item>"""
+        for i in ages
+    )
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0"><channel><title>Feed</title>{body}
+</channel></rss>""".encode()
+
+
+def atom(ages=AGES) -> bytes:
+    body = "".join(
+        f"""
+    <a:entry>
+        <a:title>Entry {i}</a:title>
+        <a:id>https://example.com/{i}</a:id>
+        <a:link href="https://example.com/{i}"/>
+        <a:content type="html"><![CDATA[<p>Not the end</a:entry></p>]]></a:content>
+        <a:updated>{(NOW - timedelta(days=10 * i)).isoformat()}</a:updated>
+    </a:entry>"""
+        for i in ages
+    )
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<a:feed xmlns:a="http://www.w3.org/2005/Atom">
+    <a:title>Feed</a:title>
+    <a:id>https://example.com/</a:id>
+    <a:updated>{NOW.isoformat()}</a:updated>{body}
+</a:feed>""".encode()
+
+
+def read(document: bytes, max_bytes: int = 1024 * 1024, chunk_size: int = 256):
+    stream = FeedStream(CUTOFF, max_bytes, EARLY_STOP_AFTER)
+    for start in range(0, len(document), chunk_size):
+        if not stream.feed(document[start : start + chunk_size]):
+            break
+    return stream
+
+
+def parse(body: bytes):
+    parsed = feedparser.parse(body)
+    assert not parsed.bozo, parsed.get("bozo_exception")
+    return parsed
+
+
+@pytest.mark.parametrize("document", [rss(), atom()], ids=["rss", "atom"])
+def test_stops_at_old_entries(document):
+    stream = read(document)
+    assert stream.stopped_early
+    assert not stream.truncated
+    assert stream.bytes_read < len(document)
+
+    entries = parse(stream.body()).entries
+    # Items 0-6 are not older than the cutoff, then it takes EARLY_STOP_AFTER.
+    assert len(entries) == 7 + EARLY_STOP_AFTER
+    assert [entry.link for entry in entries] == [
+        f"https://example.com/{i}" for i in range(len(entries))
+    ]
+
+
+@pytest.mark.parametrize("document", [rss(), atom()], ids=["rss", "atom"])
+def test_cdata_is_not_an_end_tag(document):
+    entries = parse(read(document).body()).entries
+    assert all("Not the end" in entry.summary for entry in entries)
+
+
+def test_reads_whole_feed_without_old_entries():
+    document = rss(range(5))
+    stream = read(document)
+    assert not stream.stopped_early
+    assert not stream.truncated
+    assert stream.body() == document
+    assert len(parse(stream.body()).entries) == 5
+
+
+def test_keeps_reading_feeds_not_ordered_newest_first():
+    stream = read(rss(reversed(AGES)))
+    assert not stream.stopped_early
+    assert len(parse(stream.body()).entries) == ITEMS
+
+
+@pytest.mark.parametrize("document", [rss(), atom()], ids=["rss", "atom"])
+def test_truncates_at_max_bytes(document):
+    max_bytes = len(document) // 3
+    stream = read(document, max_bytes=max_bytes)
+    assert stream.truncated
+    assert not stream.stopped_early
+    assert max_bytes < stream.bytes_read <= max_bytes + 256
+
+    body = stream.body()
+    assert len(body) <= stream.bytes_read + len(b"</channel></rss>")
+    entries = parse(body).entries
+    assert 0 < len(entries) < ITEMS
@@ -0,0 +1,9 @@
+"""Import-time budget of the web app, see benchmarks/importtime.py."""
+
+from benchmarks.importtime import BUDGET_SEC, measure
+
+
+def test_import_time():
+    results = measure(runs=3)
+    assert not results["eagerly_loaded"], results
+    assert results["import_sec"] <= BUDGET_SEC, results
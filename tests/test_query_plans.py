@@ -0,0 +1,65 @@
+"""The hot queries must be served by the indexes of 0004_query_indexes.sql,
+never by a sequential scan of entries."""
+
+import pytest
+
+from feedbasket.database import queries
+
+pytestmark = pytest.mark.anyio
+
+FEEDS = 200
+ENTRIES = 50_000
+
+
+@pytest.fixture(scope="module")
+async def seeded_pool(pg_pool):
+    # Enough rows, and fresh statistics, for the planner to prefer the indexes
+    # the way it does on a real database. Every 20th feed is muted and every
+    # 100th entry a favourite.
+    async with pg_pool.acquire() as conn:
+        await conn.execute(
+            """
+            INSERT INTO feeds (feed_url, muted)
+            SELECT 'https://example.com/' || i || '/feed', i % 20 = 0
+            FROM generate_series(1, $1::int) i
+            """,
+            FEEDS,
+        )
+        await conn.execute(
+            """
+            INSERT INTO entries (
+                entry_title, entry_url, published_date, is_favourite, feed_id
+            )
+            SELECT
+                'Entry ' || i,
+                'https://example.com/entries/' || i,
+                NOW() - i * INTERVAL '1 minute',
+                i % 100 = 0,
+                i % $2::int + 1
+            FROM generate_series(1, $1::int) i
+            """,
+            ENTRIES,
+            FEEDS,
+        )
+        await conn.execute("ANALYZE")
+    return pg_pool
+
+
+async def explain(pool, query, *args) -> str:
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(f"EXPLAIN {query.sql}", *args)
+    return "\n".join(row[0] for row in rows)
+
+
+@pytest.mark.parametrize(
+    ("name", "args"),
+    [
+        ("get_entries", (50,)),
+        ("get_favourites", ()),
+        ("get_latest_entry_date", (1,)),
+        ("delete_entries_unsubscribe", (1,)),
+    ],
+)
+async def test_no_seq_scan_on_entries(seeded_pool, name, args):
+    plan = await explain(seeded_pool, getattr(queries, name), *args)
+    assert "Seq Scan on entries" not in plan, plan
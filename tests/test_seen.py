@@ -0,0 +1,50 @@
+"""SeenFilter must never miss a stored URL, keep false positives near the
+configured error rate while full, and age URLs out by generation."""
+
+from feedbasket.seen import SeenFilter
+
+CAPACITY = 10_000
+ERROR_RATE = 0.01
+
+
+def fill(seen: SeenFilter, prefix: str, count: int = CAPACITY) -> list[str]:
+    urls = [f"https://example.com/{prefix}/{i}" for i in range(count)]
+    for url in urls:
+        seen.add(url)
+    return urls
+
+
+def test_no_false_negatives():
+    seen = SeenFilter(CAPACITY, ERROR_RATE)
+    urls = fill(seen, "stored")
+    assert all(url in seen for url in urls)
+    assert seen.checks == seen.hits == CAPACITY
+
+
+def test_false_positive_rate_at_capacity():
+    seen = SeenFilter(CAPACITY, ERROR_RATE)
+    fill(seen, "stored")
+    checks = 50_000
+    false_positives = sum(f"https://example.com/new/{i}" in seen for i in range(checks))
+    assert false_positives / checks < ERROR_RATE * 2
+
+
+def test_generations_rotate():
+    seen = SeenFilter(CAPACITY, ERROR_RATE)
+    first = fill(seen, "first")
+    # A full generation moves to the previous one and is still checked.
+    second = fill(seen, "second")
+    assert all(url in seen for url in first + second)
+
+    # Filling a third one drops the first.
+    third = fill(seen, "third")
+    assert all(url in seen for url in second + third)
+    assert sum(url in seen for url in first) / CAPACITY < ERROR_RATE * 2
+
+
+def test_memory_is_bounded():
+    seen = SeenFilter(CAPACITY, ERROR_RATE)
+    memory_bytes = seen.memory_bytes
+    for prefix in ("first", "second", "third"):
+        fill(seen, prefix)
+    assert seen.memory_bytes == memory_bytes